@@ -2,7 +2,7 @@ import streamlit as st
 import datetime
 import pandas as pd
 import json
-import re
+import time
 import services
 
 # =============================================
@@ -22,17 +22,7 @@ def load_css(file_name):
     with open(file_name, encoding="utf-8") as f:
         st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-def clean_text(text):
-    if not text:
-        return ""
-    cleaned = str(text).strip()
-    if cleaned.startswith("['") and cleaned.endswith("']"):
-        cleaned = cleaned[2:-2]
-    elif cleaned.startswith('["') and cleaned.endswith('"]'):
-        cleaned = cleaned[2:-2]
-    cleaned = cleaned.replace("\\n", "\n")
-    cleaned = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', cleaned)
-    return cleaned
+clean_text = services.clean_text
 
 # Load CSS
 try:
@@ -203,11 +193,15 @@ def render_newsroom(category):
     )
 
     # --- Load content ---
-    content = services.get_archive(date_str, category=category)
-
-    if content:
-        try:
-            data = json.loads(content)
+    # One bulk request fills every newsroom (and the neighbouring days) into the read cache,
+    # so switching newsrooms or stepping through dates is served locally.
+    services.prefetch_archives(date_str)
+    briefing = services.get_briefing(date_str, category=category)
+
+    if briefing:
+        if "markdown" in briefing:
+            st.markdown(briefing["markdown"])
+        else:
             sc = cfg["section_colors"]
 
             # --- HEADLINE (full width) ---
@@ -220,7 +214,7 @@ def render_newsroom(category):
             )
             st.markdown(
                 f'<div class="news-box box-headline {cfg["css_class"]}">'
-                f'<div class="news-content">{clean_text(data.get("headline", ""))}</div>'
+                f'<div class="news-content">{briefing["headline"]}</div>'
                 f'</div>',
                 unsafe_allow_html=True
             )
@@ -238,7 +232,7 @@ def render_newsroom(category):
                 )
                 st.markdown(
                     f'<div class="news-box box-trends {cfg["css_class"]}">'
-                    f'<div class="news-content">{clean_text(data.get("trends", ""))}</div>'
+                    f'<div class="news-content">{briefing["trends"]}</div>'
                     f'</div>',
                     unsafe_allow_html=True
                 )
@@ -259,13 +253,10 @@ def render_newsroom(category):
                 )
                 st.markdown(
                     f'<div class="news-box box-insight {cfg["css_class"]}">'
-                    f'<div class="news-content">{clean_text(data.get("insight", ""))}</div>'
+                    f'<div class="news-content">{briefing["insight"]}</div>'
                     f'</div>',
                     unsafe_allow_html=True
                 )
-
-        except json.JSONDecodeError:
-            st.markdown(content)
     else:
         st.info(f"No {category} briefing available for {date_str}.")
         if date_str == datetime.date.today().strftime("%Y-%m-%d"):
@@ -279,8 +270,20 @@ def render_newsroom(category):
 # COMMENTS
 # =============================================
 def render_comments(page_id):
-    st.subheader("💬 Comments")
-    comments = services.get_comments(page_id)
+    # The first page is refetched on every rerun so other visitors' comments show up;
+    # only the pages added with "Load more" (and their cursor) live in session state.
+    thread = services.get_comments_page(page_id)
+    more_key = f"comments_more_{page_id}"
+    more = st.session_state.get(more_key)
+    comments = thread["comments"]
+    next_cursor = thread["next_cursor"]
+    if more:
+        shown = {c["id"] for c in comments}
+        comments = comments + [c for c in more["comments"] if c["id"] not in shown]
+        next_cursor = more["next_cursor"]
+
+    total = thread["total"]
+    st.subheader(f"💬 Comments ({total})" if total else "💬 Comments")
     if comments:
         for c in comments:
             col1, col2 = st.columns([8, 1])
@@ -297,11 +300,20 @@ def render_comments(page_id):
                     pwd = st.text_input("Password", key=f"del_pwd_{c['id']}", type="password")
                     if st.button("Delete", key=f"del_btn_{c['id']}"):
                         if services.delete_comment(c['id'], pwd):
+                            if more:
+                                more["comments"] = [m for m in more["comments"] if m["id"] != c["id"]]
                             st.success("Deleted!")
                             st.rerun()
                         else:
                             st.error("Wrong Password")
             st.divider()
+        if next_cursor and st.button("Load more comments", key=f"more_{page_id}"):
+            page = services.get_comments_page(page_id, cursor=next_cursor)
+            st.session_state[more_key] = {
+                "comments": (more["comments"] if more else []) + page["comments"],
+                "next_cursor": page["next_cursor"],
+            }
+            st.rerun()
     else:
         st.info("No comments yet. Be the first!")
 
@@ -385,18 +397,25 @@ def render_admin():
         st.subheader(f"Run {res_category} Analysis")
         default_key = st.secrets.get("GEMINI_API_KEY", "")
         gemini_key = st.text_input("Gemini API Key", value=default_key, type="password")
+        force_refresh = st.checkbox("Ignore cached analysis (force a new Gemini call)", value=False)
         if st.button("🚀 Fetch & Analyze Now", use_container_width=True):
             if not gemini_key:
                 st.error("Please provide a Gemini API Key.")
             else:
                 with st.spinner(f"Fetching {res_category} RSS feeds..."):
                     feeds = services.get_feeds(category=res_category)
+                    started = time.monotonic()
                     news_items = services.fetch_all_feeds(feeds)
-                    st.write(f"Fetched **{len(news_items)}** items.")
+                    cache_stats = services.get_feed_cache_stats()
+                    st.write(f"Fetched **{len(news_items)}** items from {len(feeds)} feeds "
+                             f"in {time.monotonic() - started:.1f}s "
+                             f"(feed cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses).")
                 if news_items:
                     with st.spinner("Analyzing with Gemini AI..."):
                         services.configure_gemini(gemini_key)
-                        summary = services.generate_news_summary(news_items, category=res_category)
+                        summary = services.generate_news_summary(
+                            news_items, category=res_category, refresh=force_refresh
+                        )
                         today_str = datetime.date.today().strftime("%Y-%m-%d")
                         services.save_archive(today_str, summary, category=res_category)
                         st.success(f"Analysis Complete! Saved to {res_category} archive.")
@@ -426,6 +445,14 @@ def render_admin():
         else:
             st.info("No traffic data yet.")
 
+        st.subheader("Supabase Request Latency")
+        histogram = services.get_db_latency_histogram()
+        if histogram and histogram["count"]:
+            st.caption(f"{histogram['count']} requests since start, avg {histogram['avg_ms']:.1f} ms")
+            st.bar_chart(pd.Series(histogram["buckets"], name="Requests"))
+        else:
+            st.info("No Supabase requests recorded yet.")
+
 
 # =============================================
 # ROUTING
@@ -5,29 +5,40 @@ auto_fetch.py
 Windows 작업 스케줄러(Task Scheduler)에 등록하여 매일 원하는 시간에 실행하세요.
 
 실행 방법 (수동 테스트):
-    python auto_fetch.py
+    python auto_fetch.py            # 오늘 브리핑이 없는 카테고리만 처리
+    python auto_fetch.py --force    # 모든 카테고리 재분석 (오늘 처음 본 뉴스 기준)
+    LLM_BACKEND=fake python auto_fetch.py   # Gemini 대신 오프라인 가짜 백엔드 (부하 테스트용)
 
 로그 파일: auto_fetch.log (같은 폴더에 저장)
+증분 수집: schema_news_items.sql을 적용하면 피드의 모든 항목을 news_items에 저장하고,
+카테고리별로 마지막 성공 실행 이후 새로 들어온 뉴스만 분석합니다 (미적용 시 피드당 최근 5개).
+news_items는 실행마다 first_seen이 NEWS_ITEM_RETENTION_DAYS(기본 30일) 지난 행을 정리합니다.
+메트릭: auto_fetch.metrics.jsonl (실행별 단계/카테고리 span, 누적 기록),
+        auto_fetch.prom (마지막 실행의 Prometheus textfile)
 """
 
 import datetime
 import json
 import os
 import sys
+import time
 import tomllib  # Python 3.11+; 하위 버전은 pip install tomli 후 import tomli as tomllib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # --- 로그 설정 ---
 LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_fetch.log")
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+    format="%(asctime)s [%(levelname)s] [%(threadName)s] %(message)s",
     handlers=[
         logging.FileHandler(LOG_PATH, encoding="utf-8"),
         logging.StreamHandler(sys.stdout),
     ],
 )
 log = logging.getLogger(__name__)
+METRICS_JSONL_PATH = os.path.join(os.path.dirname(LOG_PATH), "auto_fetch.metrics.jsonl")
+METRICS_PROM_PATH = os.path.join(os.path.dirname(LOG_PATH), "auto_fetch.prom")
 
 # --- secrets 읽기: 환경변수(GitHub Actions) 우선, 없으면 secrets.toml(로컬) ---
 def load_secrets():
@@ -43,6 +54,10 @@ def load_secrets():
             "SUPABASE_URL": env_url,
             "SUPABASE_KEY": env_sb_key,
         }
+    fake_llm = os.environ.get("LLM_BACKEND", "").lower() == "fake"
+    if (env_key or fake_llm) and os.environ.get("STORAGE_BACKEND", "").lower() == "sqlite":
+        log.info("환경변수에서 secrets 로드 (SQLite 모드)")
+        return {"GEMINI_API_KEY": env_key or ""}
 
     # 2) 로컬 실행: secrets.toml에서 읽기
     secrets_path = os.path.join(
@@ -60,9 +75,16 @@ def load_secrets():
 # --- Supabase direct client (Streamlit 의존성 제거) ---
 import requests
 
+# (연결, 읽기) 타임아웃: 응답 없는 요청이 cron 실행 전체를 붙잡지 않도록
+SUPABASE_TIMEOUT = (
+    float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", 3.05)),
+    float(os.environ.get("SUPABASE_READ_TIMEOUT", 30)),
+)
+
 class SupabaseClient:
-    def __init__(self, url, key):
+    def __init__(self, url, key, timeout=SUPABASE_TIMEOUT):
         self.url = url.rstrip("/")
+        self.timeout = timeout
         self.headers = {
             "apikey": key,
             "Authorization": f"Bearer {key}",
@@ -70,11 +92,16 @@ class SupabaseClient:
             "Prefer": "return=representation",
         }
 
-    def select(self, table, **kwargs):
-        params = {"select": "*"}
+    def select(self, table, select="*", order=None, filters=None, **kwargs):
+        params = {"select": select}
         for k, v in kwargs.items():
-            params[k] = f"eq.{v}"
-        r = requests.get(f"{self.url}/rest/v1/{table}", headers=self.headers, params=params)
+            params[k] = services.postgrest_filter(v)  # 목록은 in.(), 그 외 eq.
+        if filters:
+            params.update(filters)  # PostgREST 원문 필터, 예: {"or": "(a.lt.1,b.eq.2)"}
+        if order:
+            params["order"] = order
+        r = requests.get(f"{self.url}/rest/v1/{table}", headers=self.headers, params=params,
+                         timeout=self.timeout)
         r.raise_for_status()
         return r.json()
 
@@ -84,10 +111,27 @@ class SupabaseClient:
         params = {}
         if on_conflict:
             params["on_conflict"] = on_conflict
-        r = requests.post(f"{self.url}/rest/v1/{table}", headers=headers, json=data, params=params)
+        r = requests.post(f"{self.url}/rest/v1/{table}", headers=headers, json=data, params=params,
+                          timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def insert_new(self, table, data, on_conflict=None):
+        # 이미 있는 행은 무시하고 새로 들어간 행만 돌려받음
+        headers = self.headers.copy()
+        headers["Prefer"] = "return=representation,resolution=ignore-duplicates"
+        params = {"on_conflict": on_conflict} if on_conflict else {}
+        r = requests.post(f"{self.url}/rest/v1/{table}", headers=headers, json=data, params=params,
+                          timeout=self.timeout)
         r.raise_for_status()
         return r.json()
 
+    def rpc(self, function, params=None):
+        r = requests.post(f"{self.url}/rest/v1/rpc/{function}", headers=self.headers, json=params or {},
+                          timeout=self.timeout)
+        r.raise_for_status()
+        return r.json() if r.content else True
+
 # --- RSS fetch (services.py 재사용) ---
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import services
@@ -96,15 +140,166 @@ def get_feeds(db, category):
     rows = db.select("feeds", category=category)
     return [row["url"] for row in rows]
 
+def get_missing_categories(db, date_str, categories):
+    # 오늘 날짜의 모든 카테고리 아카이브를 한 번의 요청으로 조회.
+    # 조회에 실패하면 전체 실행을 멈추지 않고 모든 카테고리를 미완료로 간주
+    try:
+        rows = db.select("archives", select="category,content", date=date_str, category=categories)
+    except Exception as e:
+        log.error(f"오늘 아카이브 조회 실패, 모든 카테고리를 분석합니다: {e}", exc_info=True)
+        return list(categories)
+    done = {row["category"] for row in rows if row.get("content")}
+    return [category for category in categories if category not in done]
+
 def save_archive(db, date_str, content, category):
-    db.upsert(
-        "archives",
-        {"date": date_str, "category": category, "content": content},
-        on_conflict="date,category",
-    )
+    with services.run_metrics.span("archive_save", category=category) as span:
+        span["bytes"] = len(content.encode("utf-8"))
+        _save_archive(db, date_str, content, category, span)
+
+def _save_archive(db, date_str, content, category, span):
+    data = {
+        "date": date_str,
+        "category": category,
+        "content": content,
+        "rendered": services.render_briefing(content),  # 앱에서 바로 렌더링할 HTML 조각
+    }
+    try:
+        db.upsert("archives", data, on_conflict="date,category")
+    except requests.HTTPError as e:
+        if not services.is_missing_column_response(e.response):
+            raise
+        # rendered 컬럼이 아직 없는 DB (schema_archives_rendered.sql 미적용)
+        log.warning("archives.rendered 컬럼 없음 — 원본 JSON만 저장합니다.")
+        span["fallback"] = 1
+        data.pop("rendered")
+        db.upsert("archives", data, on_conflict="date,category")
+
+# --- 증분 수집 (news_items 저장소) ---
+def load_new_items(db, category_feeds, feed_map, force=False):
+    # 피드 항목을 news_items에 저장하고 카테고리별 새 뉴스를 돌려줌.
+    # news_items 테이블이 없으면 None (호출 측에서 피드당 최근 5개 방식으로 대체)
+    with services.run_metrics.span("stage", stage="store_items") as span:
+        try:
+            counts = services.store_news_items(feed_map, client=db)
+            if counts is None:
+                span["fallback"] = 1
+                return None
+            span["new_items"] = sum(counts.values())
+            log.info(f"news_items: 새 항목 {span['new_items']}개 저장 "
+                     f"(피드 {sum(1 for c in counts.values() if c)}/{len(counts)}개에서)")
+
+            # --force: 커서와 무관하게 오늘(로컬 자정 이후) 처음 본 항목으로 다시 분석.
+            # first_seen은 UTC 문자열로 저장되므로(SQLite는 문자열 비교) 기준 시각도 UTC로 변환
+            since = None
+            if force:
+                since = datetime.datetime.now().astimezone().replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                ).astimezone(datetime.timezone.utc).isoformat(timespec="milliseconds")
+            return {
+                category: services.get_new_news_items(category, feeds, client=db, since=since)
+                for category, feeds in category_feeds.items()
+            }
+        except requests.RequestException as e:
+            # HTTP 오류뿐 아니라 연결 실패/타임아웃도 피드당 최근 5개 방식으로 대체
+            log.warning(f"news_items 저장소 요청 실패: {e}")
+            span["fallback"] = 1
+            return None
+
+def prune_news_items(db):
+    # 보관 기간(services.NEWS_ITEM_RETENTION)이 지난 news_items 정리. 실패해도 실행은 계속
+    with services.run_metrics.span("stage", stage="prune_items") as span:
+        try:
+            deleted = services.prune_news_items(client=db)
+        except requests.RequestException as e:
+            log.warning(f"news_items 정리 실패: {e}")
+            return
+        if deleted is None:
+            log.warning("news_items 정리 실패 (prune_news_items 함수 확인)")
+            return
+        span["deleted"] = int(deleted)
+        log.info(f"news_items: {services.NEWS_ITEM_RETENTION.days}일 지난 항목 {deleted}개 정리")
+
+# --- 카테고리 파이프라인 (분석 + 저장) ---
+CATEGORY_WORKERS = int(os.environ.get("CATEGORY_WORKERS", 4))
+
+def process_category(db, category, feeds, news_items, today_str, incremental=False, force=False):
+    log.info(f"--- [{category}] 처리 시작 ---")
+    with services.run_metrics.span("category", category=category) as span:
+        span.update(feeds=len(feeds), items=len(news_items), saved=0)
+        _process_category(db, category, feeds, news_items, today_str, span, incremental, force)
+
+def _process_category(db, category, feeds, news_items, today_str, span, incremental, force):
+    try:
+        log.info(f"[{category}] {len(feeds)}개 피드에서 {len(news_items)}개 "
+                 f"{'새 ' if incremental else ''}뉴스 수집 완료")
+
+        if not news_items:
+            log.warning(f"[{category}] {'새 ' if incremental else ''}뉴스 없음. 건너뜁니다.")
+            return
+
+        log.info(f"[{category}] Gemini 분석 중...")
+        # --force는 요약 캐시도 건너뛰고 Gemini로 다시 분석
+        summary = services.generate_news_summary(news_items, category=category, refresh=force)
+
+        # 에러 응답 체크
+        try:
+            parsed = json.loads(summary)
+            if "Error" in parsed.get("headline", ""):
+                log.error(f"[{category}] Gemini 에러 응답: {summary}")
+                return
+        except json.JSONDecodeError:
+            log.error(f"[{category}] JSON 파싱 실패: {summary[:200]}")
+            return
+
+        save_archive(db, today_str, summary, category)
+        span["saved"] = 1
+        log.info(f"[{category}] ✅ 저장 완료!")
+        # 분석에 성공한 항목까지 커서를 옮김 (실패하면 다음 실행에서 다시 분석)
+        if incremental and not services.advance_feed_cursors(category, news_items, client=db):
+            log.warning(f"[{category}] 피드 커서 갱신 실패 — 다음 실행에서 같은 뉴스를 다시 분석합니다.")
+
+    except Exception as e:
+        span["failed"] = 1
+        log.error(f"[{category}] 오류 발생: {e}", exc_info=True)
+
+# --- 메트릭 기록 ---
+def write_metrics():
+    try:
+        services.run_metrics.write_jsonl(METRICS_JSONL_PATH)
+        services.run_metrics.write_prometheus(METRICS_PROM_PATH)
+        log.info(f"메트릭 저장: {os.path.basename(METRICS_JSONL_PATH)}, {os.path.basename(METRICS_PROM_PATH)}")
+    except OSError as e:
+        log.error(f"메트릭 저장 실패: {e}")
+
+def record_model_metrics():
+    limiter_stats = services.gemini_limiter.stats()
+    services.run_metrics.record("rate_limiter", fields={
+        "calls": limiter_stats["calls"],
+        "waited_seconds": round(limiter_stats["waited_seconds"], 3),
+    })
+    for model_name, stats in services.get_model_stats().items():
+        services.run_metrics.record("model", labels={"model": model_name}, fields={
+            "calls": stats["calls"],
+            "successes": stats["successes"],
+            "errors": sum(stats["errors"].values()),
+            "sleep_seconds": round(stats["sleep_seconds"], 3),
+            "input_tokens": stats["input_tokens"],
+            "output_tokens": stats["output_tokens"],
+            "circuit_open": int(stats["circuit_open"]),
+        })
 
 # --- 메인 실행 ---
 def run():
+    services.run_metrics.enable()
+    try:
+        with services.run_metrics.span("run") as span:
+            span["forced"] = int("--force" in sys.argv)
+            _run()
+    finally:
+        record_model_metrics()
+        write_metrics()
+
+def _run():
     log.info("=" * 50)
     log.info("Auto-fetch 시작")
 
@@ -112,12 +307,25 @@ def run():
     gemini_key = secrets.get("GEMINI_API_KEY", "")
     supabase_url = secrets.get("SUPABASE_URL", "")
     supabase_key = secrets.get("SUPABASE_KEY", "")
+    if os.environ.get("LLM_BACKEND", "").lower() == "fake":
+        # 가짜 LLM 백엔드는 API 키가 필요 없음
+        log.info("LLM_BACKEND=fake: Gemini 대신 FakeLLMBackend 사용")
+        gemini_key = gemini_key or "fake"
 
-    if not gemini_key or not supabase_url or not supabase_key:
-        log.error("API 키가 secrets.toml에 없습니다. 종료.")
-        sys.exit(1)
-
-    db = SupabaseClient(supabase_url, supabase_key)
+    backend = (os.environ.get("STORAGE_BACKEND") or secrets.get("STORAGE_BACKEND", "supabase")).lower()
+    if backend == "sqlite":
+        # 로컬 SQLite 저장소 (단일 서버 / 오프라인 개발용)
+        sqlite_path = os.environ.get("SQLITE_PATH") or secrets.get("SQLITE_PATH") or services.SQLITE_DEFAULT_PATH
+        if not gemini_key:
+            log.error("GEMINI_API_KEY가 없습니다. 종료.")
+            sys.exit(1)
+        log.info(f"SQLite 저장소 사용: {sqlite_path}")
+        db = services.SqliteClient(sqlite_path)
+    else:
+        if not gemini_key or not supabase_url or not supabase_key:
+            log.error("API 키가 secrets.toml에 없습니다. 종료.")
+            sys.exit(1)
+        db = SupabaseClient(supabase_url, supabase_key)
     services.configure_gemini(gemini_key)
 
     today_str = datetime.date.today().strftime("%Y-%m-%d")
@@ -125,44 +333,92 @@ def run():
 
     categories = ["IT", "MVNO", "KSTARTUP", "VIBECODING"]
 
-    for category in categories:
-        log.info(f"--- [{category}] 처리 시작 ---")
-        try:
-            feeds = get_feeds(db, category)
+    # 이미 오늘 브리핑이 있는 카테고리는 건너뜀 (--force 로 전체 재실행)
+    if "--force" not in sys.argv:
+        with services.run_metrics.span("stage", stage="check_existing"):
+            missing = get_missing_categories(db, today_str, categories)
+        skipped = [c for c in categories if c not in missing]
+        if skipped:
+            log.info(f"오늘 브리핑이 이미 있는 카테고리 건너뜀: {', '.join(skipped)}")
+        categories = missing
+        if not categories:
+            log.info("모든 카테고리 브리핑이 이미 존재합니다. 종료.")
+            log.info("=" * 50)
+            return
+
+    # 1단계: 카테고리별 피드 목록을 모아 중복 URL은 한 번만 fetch
+    category_feeds = {}
+    with services.run_metrics.span("stage", stage="feed_list") as span:
+        for category in categories:
+            try:
+                feeds = get_feeds(db, category)
+            except Exception as e:
+                log.error(f"[{category}] 피드 목록 조회 실패: {e}", exc_info=True)
+                continue
             if not feeds:
                 log.warning(f"[{category}] RSS 피드가 없습니다. 건너뜁니다.")
                 continue
+            category_feeds[category] = feeds
+        span["categories"] = len(category_feeds)
+    if not category_feeds:
+        log.info("피드가 있는 카테고리가 없습니다. 종료.")
+        log.info("=" * 50)
+        return
 
-            log.info(f"[{category}] {len(feeds)}개 피드 fetch 중...")
-            news_items = services.fetch_all_feeds(feeds)
-            log.info(f"[{category}] {len(news_items)}개 뉴스 수집 완료")
+    total_refs = sum(len(feeds) for feeds in category_feeds.values())
+    unique_urls = len({url for feeds in category_feeds.values() for url in feeds})
+    log.info(f"피드 {total_refs}개 중 고유 URL {unique_urls}개 병렬 fetch 중 "
+             f"(workers={services.FEED_FETCH_WORKERS})...")
+    started = time.monotonic()
+    with services.run_metrics.span("stage", stage="fetch_feeds") as span:
+        # 증분 모드는 피드의 모든 항목을 사용 (max_entries=None)
+        feed_map = services.fetch_feed_map(
+            [url for feeds in category_feeds.values() for url in feeds], max_entries=None
+        )
+        span.update(feed_refs=total_refs, unique_feeds=unique_urls,
+                    items=sum(len(items) for items in feed_map.values()))
+    log.info(f"피드 fetch 완료 ({time.monotonic() - started:.1f}s)")
 
-            if not news_items:
-                log.warning(f"[{category}] 뉴스 없음. 건너뜁니다.")
-                continue
-
-            log.info(f"[{category}] Gemini 분석 중...")
-            summary = services.generate_news_summary(news_items, category=category)
+    category_news = load_new_items(db, category_feeds, feed_map, force="--force" in sys.argv)
+    incremental = category_news is not None
+    if not incremental:
+        log.warning("news_items 저장소를 쓸 수 없음 (schema_news_items.sql 적용 여부 확인) — 피드당 최근 "
+                    f"{services.FEED_MAX_ENTRIES}개 뉴스로 분석합니다.")
+        category_news = {
+            category: [item for url in dict.fromkeys(feeds)
+                       for item in feed_map[url][:services.FEED_MAX_ENTRIES]]
+            for category, feeds in category_feeds.items()
+        }
 
-            # 에러 응답 체크
-            try:
-                parsed = json.loads(summary)
-                if "Error" in parsed.get("headline", ""):
-                    log.error(f"[{category}] Gemini 에러 응답: {summary}")
-                    continue
-            except json.JSONDecodeError:
-                log.error(f"[{category}] JSON 파싱 실패: {summary[:200]}")
-                continue
+    # 2단계: 카테고리별 분석 및 저장을 동시에 실행
+    # (고정 sleep 대신 services.gemini_limiter가 RPM/TPM 한도에 맞춰 호출 속도를 조절)
+    workers = max(1, min(CATEGORY_WORKERS, len(category_feeds)))
+    with services.run_metrics.span("stage", stage="categories") as span:
+        span["workers"] = workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="category") as pool:
+            futures = [
+                pool.submit(process_category, db, category, feeds, category_news[category], today_str,
+                            incremental, "--force" in sys.argv)
+                for category, feeds in category_feeds.items()
+            ]
+            for future in futures:
+                future.result()
 
-            save_archive(db, today_str, summary, category)
-            log.info(f"[{category}] ✅ 저장 완료!")
+    if incremental:
+        prune_news_items(db)
 
-        except Exception as e:
-            log.error(f"[{category}] 오류 발생: {e}", exc_info=True)
-            
-        import time
-        time.sleep(15) # Rate limit 방지를 위해 15초 대기
+    limiter_stats = services.gemini_limiter.stats()
+    log.info(f"Gemini rate limiter: {limiter_stats['calls']}회 호출, "
+             f"대기 {limiter_stats['waited_seconds']:.1f}s (RPM {services.GEMINI_RPM}, TPM {services.GEMINI_TPM})")
+    for model_name, stats in services.get_model_stats().items():
+        log.info(f"Gemini {model_name}: 호출 {stats['calls']}회, 성공 {stats['successes']}회, "
+                 f"오류 {stats['errors']}, 평균 {stats['avg_latency']:.1f}s, "
+                 f"대기 {stats['sleep_seconds']:.1f}s, 토큰 {stats['input_tokens']}/{stats['output_tokens']}, "
+                 f"circuit_open={stats['circuit_open']}")
 
+    cache_stats = services.get_feed_cache_stats()
+    log.info(f"피드 캐시: hit {cache_stats['hits']} / miss {cache_stats['misses']} "
+             f"(캐시된 피드 {cache_stats['cached_feeds']}개)")
     log.info("Auto-fetch 완료")
     log.info("=" * 50)
 
@@ -0,0 +1,150 @@
+"""
+memory_benchmark.py
+-------------------
+녹화해 둔 RSS 픽스처를 파싱해 뉴스 항목 목록을 만들 때, 예전 dict 표현과
+services.NewsItem(슬롯 + 출처 intern + 요약 압축)이 차지하는 메모리를 비교합니다.
+
+배율(--scales)은 run_benchmarks.py와 같습니다: 1은 data/feeds.json의 피드 그대로,
+10/100은 제목/링크가 다른 복제본으로 피드 수를 늘립니다.
+두 가지 경로를 잽니다:
+    parsed   feedparser 파싱 결과로 항목을 만들 때 (services._download_feed)
+    stored   JSON으로 저장된 항목을 다시 읽을 때 (피드 캐시 적중, news_items 조회 결과)
+각 표현마다 tracemalloc으로 항목 목록이 만들어진 뒤 남아 있는 메모리(retained)와 최대치(peak)를 재고,
+두 표현으로 만든 프롬프트(cluster_news_items + build_news_text)가 같은지도 확인합니다.
+
+실행 방법 (프로젝트 루트에서):
+    python benchmarks/memory_benchmark.py                       # 결과: benchmarks/results/memory.json
+    python benchmarks/memory_benchmark.py --scales 1 10
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import feedparser
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from run_benchmarks import BENCH_DIR, ROOT, FixtureLibrary, git_revision, write_json
+import services
+
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "memory.json")
+
+
+def dict_item(entry, source_title, url):
+    # services._download_feed가 NewsItem 이전에 만들던 dict와 같은 모양
+    return {
+        'title': entry.get('title', 'No Title'),
+        'link': entry.get('link', '#'),
+        'summary': entry.get('summary', ''),
+        'source': source_title,
+        'published': entry.get('published', entry.get('updated', '')),
+        'published_at': services._entry_time(entry),
+        'guid': entry.get('id') or '',
+        'feed_url': url,
+    }
+
+def slotted_item(entry, source_title, url):
+    return services.NewsItem(
+        title=entry.get('title', 'No Title'),
+        link=entry.get('link', '#'),
+        summary=entry.get('summary', ''),
+        source=source_title,
+        published=entry.get('published', entry.get('updated', '')),
+        published_at=services._entry_time(entry),
+        guid=entry.get('id') or '',
+        feed_url=url,
+    )
+
+def feed_plan(library, scale):
+    names = sorted(set(library.manifest.values()))
+    return [(f"fixture://{name}?copy={copy}", library.render(name, copy)) for copy in range(scale) for name in names]
+
+def build_items(plan, make_item):
+    items = []
+    for url, body in plan:
+        feed = feedparser.parse(body)
+        source_title = feed.feed.get('title', 'Unknown Source')
+        items.extend(make_item(entry, source_title, url) for entry in feed.entries)
+    return items
+
+def measure_memory(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    items = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return items, {
+        "items": len(items),
+        "retained_bytes": retained,
+        "bytes_per_item": round(retained / max(len(items), 1), 1),
+        "peak_bytes": peak,
+        "build_ms": round(elapsed * 1000, 3),
+    }
+
+def compare_path(build_dicts, build_items):
+    dict_items, dict_stats = measure_memory(build_dicts)
+    slotted_items, slotted_stats = measure_memory(build_items)
+    saved = 1 - slotted_stats["retained_bytes"] / max(dict_stats["retained_bytes"], 1)
+    return {
+        "dict": dict_stats,
+        "news_item": slotted_stats,
+        "retained_saving": round(saved, 3),
+        "same_prompt": same_prompt(dict_items, slotted_items),
+    }
+
+def same_prompt(dict_items, slotted_items):
+    expected = services.build_news_text(services.cluster_news_items(dict_items), services.DEFAULT_NEWS_BUDGET)
+    actual = services.build_news_text(services.cluster_news_items(slotted_items), services.DEFAULT_NEWS_BUDGET)
+    return expected == actual
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict vs NewsItem memory use on recorded RSS fixtures")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    library = FixtureLibrary()
+    results = {}
+    for scale in args.scales:
+        plan = feed_plan(library, scale)
+        stored = json.dumps(build_items(plan, dict_item), ensure_ascii=False)
+        results[f"{scale}x"] = row = {
+            "feeds": len(plan),
+            "parsed": compare_path(lambda: build_items(plan, dict_item), lambda: build_items(plan, slotted_item)),
+            "stored": compare_path(
+                lambda: json.loads(stored),
+                lambda: [services.NewsItem.from_dict(data) for data in json.loads(stored)],
+            ),
+        }
+        for path in ("parsed", "stored"):
+            dict_stats, slotted_stats = row[path]["dict"], row[path]["news_item"]
+            print(f"🧠 scale {scale}x {path:<6}: {dict_stats['items']} items, "
+                  f"dict {dict_stats['retained_bytes'] / 1024:.0f} KiB -> "
+                  f"NewsItem {slotted_stats['retained_bytes'] / 1024:.0f} KiB "
+                  f"({row[path]['retained_saving']:.0%} 절감)")
+            if not row[path]["same_prompt"]:
+                print(f"❌ scale {scale}x {path}: dict와 NewsItem의 프롬프트가 다릅니다")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "fixtures": len(library.fixtures),
+        },
+        "results": results,
+    }
+    write_json(args.output, report)
+    print(f"📄 결과 저장: {os.path.relpath(args.output, ROOT)}")
+    if not all(row[path]["same_prompt"] for row in results.values() for path in ("parsed", "stored")):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
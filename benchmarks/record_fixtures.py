@@ -0,0 +1,64 @@
+"""
+record_fixtures.py
+------------------
+data/feeds.json의 RSS 피드를 실제로 내려받아 benchmarks/fixtures에 원본 바이트 그대로
+저장하고 manifest.json(피드 URL -> 파일명)을 갱신합니다. 피드 형식이 바뀌었을 때 다시 실행하세요.
+
+실행 방법 (프로젝트 루트에서):
+    python benchmarks/record_fixtures.py
+"""
+import json
+import os
+import re
+import sys
+from urllib.parse import urlsplit
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+from services import FEED_TIMEOUT, FEED_USER_AGENT
+
+def fixture_name(url, taken):
+    parts = urlsplit(url)
+    host = parts.netloc.split(":")[0].removeprefix("www.").split(".")[0]
+    tail = re.sub(r"[^0-9A-Za-z]+", "_", parts.path + "_" + parts.query).strip("_")[:40]
+    name = f"{host}_{tail}.xml" if tail else f"{host}.xml"
+    stem, index = name[:-4], 2
+    while name in taken:
+        name = f"{stem}_{index}.xml"
+        index += 1
+    return name
+
+def main():
+    with open(os.path.join(ROOT, "data", "feeds.json"), encoding="utf-8") as f:
+        feeds = json.load(f)
+    urls = list(dict.fromkeys(url for category_urls in feeds.values() for url in category_urls))
+
+    manifest_path = os.path.join(FIXTURE_DIR, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for url in urls:
+        try:
+            response = requests.get(url, headers={"User-Agent": FEED_USER_AGENT}, timeout=FEED_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠️ {url}: {e} (기존 픽스처 유지)")
+            continue
+        name = manifest.get(url) or fixture_name(url, set(manifest.values()))
+        with open(os.path.join(FIXTURE_DIR, name), "wb") as f:
+            f.write(response.content)
+        manifest[url] = name
+        print(f"✅ {name} ({len(response.content):,} bytes)")
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+run_benchmarks.py
+-----------------
+녹화해 둔 RSS 픽스처(benchmarks/fixtures)를 로컬 HTTP 서버로 재생하며
+파이프라인의 단계별 소요 시간을 측정합니다. 네트워크, Gemini API, Supabase 없이 실행됩니다.
+
+측정 단계:
+    parse_feeds       services.fetch_all_feeds (다운로드 + feedparser 파싱)
+    prompt_assembly   cluster_news_items + filter_relevant_items + select_news_items
+                      + 모델별 build_news_text/build_prompt
+                      (카테고리별 요약 토큰: 원본 HTML -> clean_summary 결과)
+    generate_summary  generate_news_summary 전체 (FakeLLMBackend, 지연 0)
+    archive_save      services.save_archive -> PostgREST 스텁 (scripts/postgrest_stub.py)
+    render            render_briefing / clean_text (앱의 render_newsroom 경로)
+
+배율(--scales): 1은 data/feeds.json의 피드 그대로, 10/100은 피드 수를 10배/100배로 늘립니다
+(복제본은 다른 기사 제목을 섞어 서로 다른 뉴스가 되도록 만듭니다).
+
+실행 방법 (프로젝트 루트에서):
+    python benchmarks/run_benchmarks.py                          # 결과: benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --save-baseline          # 현재 결과를 benchmarks/baseline.json으로 저장
+    python benchmarks/run_benchmarks.py --scales 1 10 --repeat 3
+
+baseline.json이 있으면 단계별 중앙값을 비교하고, --max-regression(기본 25%)보다 느려진
+단계가 있으면 종료 코드 1을 반환합니다. 같은 머신에서 만든 baseline과 비교하세요
+(머신마다 다르므로 저장소에는 baseline을 넣지 않습니다).
+baseline이 없으면 경고만 출력하고 비교를 건너뛰며, --max-regression을 직접 지정했는데
+baseline이 없으면 회귀 검사를 할 수 없으므로 종료 코드 2를 반환합니다 (CI에서 조용히 통과하지 않도록).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# 벤치마크가 data/ 아래의 실제 캐시 파일을 건드리지 않도록 services import 전에 지정
+_TMP_DIR = tempfile.mkdtemp(prefix="newsroom-bench-")
+os.environ["FEED_CACHE_PATH"] = os.path.join(_TMP_DIR, "feed_cache.json")
+os.environ["SUMMARY_CACHE_PATH"] = os.path.join(_TMP_DIR, "summary_cache.json")
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+import services
+from postgrest_stub import PostgrestStub
+
+
+# --- 픽스처 재생 서버 ---
+def _encoding_of(raw):
+    head = raw[:200].decode("ascii", "ignore").lower()
+    if 'encoding="euc-kr"' in head:
+        return "euc-kr"
+    return "utf-8"
+
+def _item_fields(raw, encoding):
+    # expat can't read EUC-KR itself, so parse the decoded text without its declaration
+    text = raw.decode(encoding)
+    if text.startswith("<?xml"):
+        text = text[text.index("?>") + 2:]
+    root = ET.fromstring(text)
+    return [(item.findtext("title") or "", item.findtext("link") or "") for item in root.iter("item")]
+
+class FixtureLibrary:
+    # Serves fixture k-th copies: copy 0 is the recording as-is; other copies swap each
+    # title's second half with another recorded story so they don't collapse in dedup.
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        with open(os.path.join(fixture_dir, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.fixtures = {}
+        for name in sorted(set(self.manifest.values())):
+            with open(os.path.join(fixture_dir, name), "rb") as f:
+                raw = f.read()
+            encoding = _encoding_of(raw)
+            self.fixtures[name] = (raw, encoding, _item_fields(raw, encoding))
+        self.title_pool = [title for _, _, items in self.fixtures.values() for title, _ in items]
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def _spliced_title(self, title, index, copy):
+        words = title.split()
+        other = self.title_pool[(index * 31 + copy * 17) % len(self.title_pool)].split()
+        head = words[: max(1, len(words) // 2)]
+        tail = other[len(other) // 2:]
+        return " ".join(head + tail + [f"({copy}보)"])
+
+    def render(self, name, copy):
+        key = (name, copy)
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+        raw, encoding, items = self.fixtures[name]
+        if copy:
+            text = raw.decode(encoding)
+            for index, (title, link) in enumerate(items):
+                if title:
+                    text = text.replace(escape(title), escape(self._spliced_title(title, index, copy)))
+                if link:
+                    text = text.replace(escape(link), escape(f"{link}#bench-{copy}"))
+            body = text.encode(encoding, errors="xmlcharrefreplace")
+        else:
+            body = raw
+        with self.lock:
+            self.cache[key] = body
+        return body
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        name = parts.path.rsplit("/", 1)[-1]
+        if name not in self.server.library.fixtures:
+            self.send_error(404)
+            return
+        copy = int(parse_qs(parts.query).get("copy", ["0"])[0])
+        body = self.server.library.render(name, copy)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FixtureServer:
+    def __init__(self, library, port=0):
+        self.library = library
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.library = library
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def category_feeds(self, scale):
+        # data/feeds.json의 URL을 픽스처 URL로 바꾸고, 배율만큼 복제본을 추가
+        with open(os.path.join(ROOT, "data", "feeds.json"), encoding="utf-8") as f:
+            feeds = json.load(f)
+        host, port = self.httpd.server_address[:2]
+        plan = {}
+        for category, urls in feeds.items():
+            plan[category] = [
+                f"http://{host}:{port}/feeds/{self.library.manifest[url]}?copy={copy}"
+                for copy in range(scale)
+                for url in urls
+                if url in self.library.manifest
+            ]
+        return plan
+
+
+# --- 측정 ---
+def measure(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    timing = {
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+    return timing, result
+
+def bench_scale(server, scale, repeat):
+    results = {}
+    category_feeds = server.category_feeds(scale)
+    all_urls = [url for urls in category_feeds.values() for url in urls]
+
+    # 1) 피드 다운로드 + 파싱
+    def parse_feeds():
+        return services.fetch_category_feeds(
+            category_feeds,
+            max_workers=services.FEED_FETCH_WORKERS,
+            total_timeout=max(services.FEED_BATCH_TIMEOUT, 600),
+            use_cache=False,
+        )
+    timing, category_news = measure(parse_feeds, repeat)
+    results["parse_feeds"] = {
+        **timing,
+        "feeds": len(set(all_urls)),
+        "items": sum(len(items) for items in category_news.values()),
+    }
+
+    # 2) 프롬프트 조립 (generate_news_summary의 모델별 프롬프트 생성 경로)
+    budgets = sorted({services.news_token_budget(m) for m in services.MODEL_NEWS_BUDGETS})
+
+    def prompt_assembly():
+        sizes = {}
+        for category, items in category_news.items():
+            clustered = services.cluster_news_items(items, category=category)
+            clustered, _ = services.filter_relevant_items(clustered, category)
+            clustered = services.select_news_items(clustered)
+            for budget in budgets:
+                news_text, used = services.build_news_text(clustered, budget)
+                prompt = services.build_prompt(news_text, category)
+                sizes[(category, budget)] = (len(clustered), used, services.estimate_tokens(prompt))
+        return sizes
+    timing, sizes = measure(prompt_assembly, repeat)
+    results["prompt_assembly"] = {
+        **timing,
+        "clusters": sum(clusters for (_, budget), (clusters, _, _) in sizes.items() if budget == budgets[0]),
+        "prompt_tokens": max(tokens for _, _, tokens in sizes.values()),
+        "summary_tokens": {
+            category: {
+                "raw": sum(services.estimate_tokens(item.summary) for item in items),
+                "clean": sum(services.estimate_tokens(services.prompt_summary(item)) for item in items),
+            }
+            for category, items in category_news.items()
+        },
+    }
+
+    # 3) generate_news_summary 전체 (LLM은 지연 없는 FakeLLMBackend)
+    services.configure_gemini(backend=services.FakeLLMBackend(seed=0))
+    # GEMINI_RPM(기본 10) 제한기를 그대로 쓰면 10회 이후로는 대기 시간만 재게 되므로 제한을 풉니다
+    services.gemini_limiter = services.RateLimiter(10**9, 10**12)
+
+    def generate_summary():
+        return {
+            category: services.generate_news_summary(items, category=category, refresh=True)
+            for category, items in category_news.items()
+        }
+    timing, summaries = measure(generate_summary, repeat)
+    results["generate_summary"] = {**timing, "categories": len(summaries)}
+
+    # 4) 아카이브 저장 (배율만큼의 날짜 x 카테고리를 PostgREST 스텁에 upsert)
+    base_day = date(2026, 2, 4)
+    saves = [
+        ((base_day - timedelta(days=offset)).strftime("%Y-%m-%d"), category, content)
+        for offset in range(scale)
+        for category, content in summaries.items()
+    ]
+    with PostgrestStub() as stub:
+        services.db = services.SimpleSupabaseClient(stub.url, "bench-key")
+
+        def archive_save():
+            for date_str, category, content in saves:
+                services.save_archive(date_str, content, category)
+            return stub.stats()["round_trips"]
+        stub.reset_stats()
+        timing, round_trips = measure(archive_save, repeat)
+        services.db.session.close()
+    results["archive_save"] = {**timing, "archives": len(saves), "round_trips_per_run": round_trips // repeat}
+
+    # 5) 렌더링 (새 JSON 브리핑 + 예전 마크다운 브리핑)
+    with open(os.path.join(ROOT, "data", "news_archive.json"), encoding="utf-8") as f:
+        legacy = list(json.load(f).values())
+    contents = [content for _, _, content in saves] + legacy * scale
+
+    def render():
+        return [services.render_briefing(content) for content in contents]
+    timing, rendered = measure(render, repeat)
+    results["render"] = {
+        **timing,
+        "briefings": len(rendered),
+        "html_chars": sum(len(v) for r in rendered for k, v in r.items() if k != "schema"),
+    }
+    return results
+
+
+# --- baseline 비교 ---
+def compare(current, baseline, max_regression, noise_floor_ms):
+    comparison = {}
+    regressions = []
+    for scale, stages in current.items():
+        for stage, result in stages.items():
+            base = (baseline.get(scale) or {}).get(stage)
+            if not base:
+                continue
+            ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else None
+            status = "ok"
+            if ratio is not None and ratio > 1 + max_regression and \
+                    result["median_ms"] - base["median_ms"] > noise_floor_ms:
+                status = "regression"
+                regressions.append(f"{scale}/{stage}")
+            elif ratio is not None and ratio < 1 - max_regression:
+                status = "improved"
+            comparison.setdefault(scale, {})[stage] = {
+                "baseline_ms": base["median_ms"],
+                "current_ms": result["median_ms"],
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "status": status,
+            }
+    return comparison, regressions
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded RSS fixtures and time each pipeline stage")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results to --baseline")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="allowed slowdown ratio (default 0.25 = 25%%); "
+                             "passing it makes a missing baseline an error")
+    parser.add_argument("--noise-floor-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    library = FixtureLibrary()
+    server = FixtureServer(library).start()
+    results = {}
+    try:
+        for scale in args.scales:
+            print(f"⏱️ scale {scale}x ...")
+            results[f"{scale}x"] = bench_scale(server, scale, args.repeat)
+            for stage, result in results[f"{scale}x"].items():
+                print(f"   {stage:<17} {result['median_ms']:>10.1f} ms")
+            for category, tokens in results[f"{scale}x"]["prompt_assembly"]["summary_tokens"].items():
+                if tokens["raw"]:
+                    print(f"   summary tokens {category:<10} {tokens['raw']:>8} -> {tokens['clean']:>8} "
+                          f"({1 - tokens['clean'] / tokens['raw']:.0%} smaller)")
+    finally:
+        server.stop()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "fixtures": len(library.fixtures),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    missing_baseline = False
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline"] = {"path": os.path.relpath(args.baseline, ROOT), "meta": baseline.get("meta")}
+        max_regression = 0.25 if args.max_regression is None else args.max_regression
+        report["comparison"], regressions = compare(
+            results, baseline.get("results", {}), max_regression, args.noise_floor_ms
+        )
+        for scale, stages in report["comparison"].items():
+            for stage, row in stages.items():
+                if row["status"] != "ok":
+                    print(f"{'❌' if row['status'] == 'regression' else '✅'} {scale}/{stage}: "
+                          f"{row['baseline_ms']:.1f} -> {row['current_ms']:.1f} ms (x{row['ratio']})")
+    elif not args.save_baseline:
+        missing_baseline = True
+        report["baseline"] = None
+        print(f"⚠️ baseline 없음 ({os.path.relpath(args.baseline, ROOT)}) — 회귀 비교를 건너뜁니다. "
+              "같은 머신에서 --save-baseline으로 먼저 만드세요.")
+
+    write_json(args.output, report)
+    print(f"📄 결과 저장: {os.path.relpath(args.output, ROOT)}")
+    if args.save_baseline:
+        write_json(args.baseline, report)
+        print(f"📌 baseline 저장: {os.path.relpath(args.baseline, ROOT)}")
+    if regressions:
+        print(f"❌ 성능 회귀: {', '.join(regressions)}")
+        sys.exit(1)
+    if missing_baseline and args.max_regression is not None:
+        print("❌ --max-regression을 지정했지만 비교할 baseline이 없습니다.")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -66,7 +66,10 @@ CREATE POLICY "Allow anon update archives"
     ON archives FOR UPDATE TO anon USING (true) WITH CHECK (true);
 
 
--- 5. comments — 조회 + 삽입 + 삭제 허용
+-- 5. comments — 조회 + 삽입 허용
+--    (삭제는 schema_comments_delete.sql의 delete_comment 함수로만 가능)
+--    schema_comments_delete.sql을 먼저 적용하세요: 아래 열 권한이 들어가면 앱이 예전처럼
+--    password를 읽어 비교할 수 없으므로 delete_comment 함수가 있어야 삭제가 됩니다.
 DROP POLICY IF EXISTS "Allow anon read comments" ON comments;
 DROP POLICY IF EXISTS "Allow anon insert comments" ON comments;
 DROP POLICY IF EXISTS "Allow anon delete comments" ON comments;
@@ -77,8 +80,9 @@ CREATE POLICY "Allow anon read comments"
 CREATE POLICY "Allow anon insert comments"
     ON comments FOR INSERT TO anon WITH CHECK (true);
 
-CREATE POLICY "Allow anon delete comments"
-    ON comments FOR DELETE TO anon USING (true);
+-- 조회는 공개 열만 (비밀번호 해시는 select=password로도 읽을 수 없음)
+REVOKE SELECT ON comments FROM anon, authenticated;
+GRANT SELECT (id, created_at, page_id, nickname, content) ON comments TO anon, authenticated;
 
 
 -- 확인: RLS 활성화 상태 확인
@@ -0,0 +1,10 @@
+-- =============================================
+-- 아카이브 사전 렌더링 컬럼 추가
+-- 실행 위치: Supabase Dashboard > SQL Editor
+-- =============================================
+-- save_archive가 Gemini JSON을 저장할 때 headline/trends/insight HTML 조각을
+-- 미리 만들어 rendered 컬럼에 함께 저장합니다.
+--   {"schema": 1, "headline": "<strong>...</strong> ...", "trends": "...", "insight": "..."}
+-- 앱은 rendered를 바로 출력하고, 값이 없거나 schema 버전이 다른 예전 행만 실시간으로 파싱합니다.
+
+ALTER TABLE archives ADD COLUMN IF NOT EXISTS rendered JSONB;
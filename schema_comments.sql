@@ -4,7 +4,7 @@ create table public.comments (
   created_at timestamp with time zone default timezone('utc'::text, now()) not null,
   page_id text not null, -- Stores "IT_2024-02-12" or similar
   nickname text not null,
-  password text not null, -- Simple text password for deletion
+  password text not null, -- bcrypt hash of the deletion password (trigger in schema_comments_delete.sql)
   content text not null
 );
 
@@ -16,14 +16,18 @@ create policy "Public comments are viewable by everyone."
   on public.comments for select
   using ( true );
 
+-- The read policy is row-level only: also restrict anon to the public columns so the
+-- password hash can't be fetched with ?select=password
+revoke select on public.comments from anon, authenticated;
+grant select (id, created_at, page_id, nickname, content) on public.comments to anon, authenticated;
+
 -- Create Policy: Allow Public Insert
 create policy "Anyone can insert a comment."
   on public.comments for insert
   with check ( true );
 
--- Create Policy: Allow Public Delete (Ideally restricted, but for this simple app we handle password check in app logic or via RLS using headers if advanced, but simple app logic is fine for now)
--- Note: In a real app, strict RLS or a Postgres Function for deletion with password check is better.
--- For now, allowing delete if they know the ID (App handles password check before calling delete API).
-create policy "Anyone can delete comments."
-  on public.comments for delete
-  using ( true );
+-- No DELETE policy: comments are deleted only through the delete_comment()
+-- function in schema_comments_delete.sql, which checks the password hash.
+-- Run schema_comments_delete.sql right after this file: it adds the trigger that
+-- hashes passwords on insert, and without it the column grants above leave the app
+-- no way to check a password.
@@ -0,0 +1,62 @@
+-- =============================================
+-- 댓글 삭제: 서버 측 비밀번호 해싱/검증 + 삭제 함수
+-- 실행 위치: Supabase Dashboard > SQL Editor
+-- =============================================
+-- services.add_comment는 입력한 비밀번호를 그대로 INSERT하고, 아래 BEFORE INSERT 트리거가
+-- pgcrypto bcrypt(crypt + gen_salt('bf'))로 바꿔 저장합니다. 평문은 테이블에 남지 않습니다.
+-- services.delete_comment는 아래 함수를 REST rpc 엔드포인트로 한 번만 호출합니다.
+--   POST /rest/v1/rpc/delete_comment   {"p_id": "<uuid>", "p_password": "..."}
+-- 해시 비교와 DELETE가 한 문장에서 처리되므로, 누구나 삭제할 수 있던 DELETE 정책을 제거합니다.
+-- 이 함수가 없으면(HTTP 404 / PGRST202) 앱은 예전처럼 select 후 비교하는 방식으로 삭제합니다.
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+CREATE OR REPLACE FUNCTION hash_comment_password()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public, extensions
+AS $$
+BEGIN
+    NEW.password := crypt(NEW.password, gen_salt('bf', 10));
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS comments_hash_password ON comments;
+CREATE TRIGGER comments_hash_password
+    BEFORE INSERT ON comments
+    FOR EACH ROW EXECUTE FUNCTION hash_comment_password();
+
+CREATE OR REPLACE FUNCTION delete_comment(p_id UUID, p_password TEXT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+DECLARE
+    deleted INT;
+BEGIN
+    -- 아래 UPDATE 이후 모든 행이 bcrypt 해시이므로 crypt(입력, 저장된 해시)로 비교
+    DELETE FROM comments c
+    WHERE c.id = p_id
+      AND c.password = crypt(p_password, c.password);
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted > 0;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION delete_comment(UUID, TEXT) TO anon;
+
+-- 트리거 이전에 저장된 평문 비밀번호를 bcrypt로 변환 (bcrypt 해시는 "$2a$"로 시작)
+UPDATE comments
+SET password = crypt(password, gen_salt('bf', 10))
+WHERE password NOT LIKE '$2a$%';
+
+-- 이제 삭제는 delete_comment 함수로만 가능
+DROP POLICY IF EXISTS "Anyone can delete comments." ON comments;
+DROP POLICY IF EXISTS "Allow anon delete comments" ON comments;
+
+-- 열 단위 권한: SELECT 정책이 열려 있어도 anon 키로 select=password를 읽을 수 없게 함.
+-- delete_comment는 SECURITY DEFINER라 영향 없음. add_comment는 select=로 반환 열을 제한합니다.
+REVOKE SELECT ON comments FROM anon, authenticated;
+GRANT SELECT (id, created_at, page_id, nickname, content) ON comments TO anon, authenticated;
@@ -0,0 +1,41 @@
+-- =============================================
+-- 방문자 카운터: 서버 측 원자적 증가 함수
+-- 실행 위치: Supabase Dashboard > SQL Editor
+-- =============================================
+-- services.ViewCounter가 REST rpc 엔드포인트로 호출합니다.
+--   POST /rest/v1/rpc/increment_views   {"p_date": "2026-02-04", "p_count": 3}
+--   POST /rest/v1/rpc/get_view_stats    {"p_days": 30}
+-- 읽고-쓰기(select 후 update) 대신 한 문장으로 증가시키므로 동시 접속 시 카운트가 유실되지 않습니다.
+
+CREATE OR REPLACE FUNCTION increment_views(p_date DATE, p_count INT DEFAULT 1)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO global_stats (key, value) VALUES ('total_views', p_count)
+    ON CONFLICT (key) DO UPDATE SET value = global_stats.value + EXCLUDED.value;
+
+    INSERT INTO daily_stats (date, views) VALUES (p_date, p_count)
+    ON CONFLICT (date) DO UPDATE SET views = daily_stats.views + EXCLUDED.views;
+$$;
+
+CREATE OR REPLACE FUNCTION get_view_stats(p_days INT DEFAULT 30)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT json_build_object(
+        'total_views', COALESCE((SELECT value FROM global_stats WHERE key = 'total_views'), 0),
+        'daily_views', COALESCE(
+            (SELECT json_object_agg(d.date, d.views)
+               FROM (SELECT date, views FROM daily_stats ORDER BY date DESC LIMIT p_days) d),
+            '{}'::json
+        )
+    );
+$$;
+
+GRANT EXECUTE ON FUNCTION increment_views(DATE, INT) TO anon;
+GRANT EXECUTE ON FUNCTION get_view_stats(INT) TO anon;
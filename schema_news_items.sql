@@ -0,0 +1,80 @@
+-- =============================================
+-- 증분 수집용 뉴스 항목 저장소 + 피드별 커서
+-- 실행 위치: Supabase Dashboard > SQL Editor
+-- =============================================
+-- auto_fetch.py가 피드의 모든 항목을 news_items에 한 번씩만 저장하고
+-- (id = sha256(피드 URL + 항목 GUID/링크) 앞 32자, 중복은 resolution=ignore-duplicates로 무시),
+-- 카테고리별로 "마지막 성공 실행 이후 처음 본 항목"만 Gemini에 보냅니다.
+-- 이 스크립트를 적용하지 않으면 auto_fetch는 예전처럼 피드당 최근 5개 항목으로 동작합니다.
+-- 보관 기간: auto_fetch가 실행마다 prune_news_items로 first_seen이 30일(NEWS_ITEM_RETENTION_DAYS)
+-- 지난 행을 지웁니다. 발행일이 그보다 오래된 항목은 애초에 저장하지 않으므로 다시 "새 항목"이 되지 않습니다.
+
+CREATE TABLE IF NOT EXISTS news_items (
+    id TEXT PRIMARY KEY,
+    feed_url TEXT NOT NULL,
+    guid TEXT,
+    title TEXT NOT NULL,
+    link TEXT,
+    summary TEXT,
+    source TEXT,
+    published TEXT,              -- 피드 원문 날짜 문자열
+    published_at TIMESTAMPTZ,    -- 파싱된 발행 시각 (없을 수 있음)
+    first_seen TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS news_items_feed_seen_idx ON news_items (feed_url, first_seen);
+CREATE INDEX IF NOT EXISTS news_items_first_seen_idx ON news_items (first_seen);
+
+-- 카테고리 x 피드별 커서: 해당 카테고리가 마지막으로 브리핑한 항목의 first_seen
+-- (같은 피드를 여러 카테고리가 구독하므로 카테고리별로 따로 관리)
+CREATE TABLE IF NOT EXISTS feed_cursors (
+    category TEXT NOT NULL,
+    feed_url TEXT NOT NULL,
+    seen_until TIMESTAMPTZ NOT NULL,
+    last_success_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (category, feed_url)
+);
+
+ALTER TABLE news_items ENABLE ROW LEVEL SECURITY;
+ALTER TABLE feed_cursors ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow anon read news_items" ON news_items;
+DROP POLICY IF EXISTS "Allow anon insert news_items" ON news_items;
+DROP POLICY IF EXISTS "Allow anon read feed_cursors" ON feed_cursors;
+DROP POLICY IF EXISTS "Allow anon insert feed_cursors" ON feed_cursors;
+DROP POLICY IF EXISTS "Allow anon update feed_cursors" ON feed_cursors;
+
+CREATE POLICY "Allow anon read news_items"
+    ON news_items FOR SELECT TO anon USING (true);
+
+CREATE POLICY "Allow anon insert news_items"
+    ON news_items FOR INSERT TO anon WITH CHECK (true);
+
+CREATE POLICY "Allow anon read feed_cursors"
+    ON feed_cursors FOR SELECT TO anon USING (true);
+
+CREATE POLICY "Allow anon insert feed_cursors"
+    ON feed_cursors FOR INSERT TO anon WITH CHECK (true);
+
+CREATE POLICY "Allow anon update feed_cursors"
+    ON feed_cursors FOR UPDATE TO anon USING (true) WITH CHECK (true);
+
+-- 오래된 항목 정리: anon에는 DELETE 정책을 주지 않고 이 함수만 허용.
+-- 인자와 관계없이 최근 7일 항목은 지우지 않습니다.
+CREATE OR REPLACE FUNCTION prune_news_items(p_before TIMESTAMPTZ)
+RETURNS INT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    deleted INT;
+BEGIN
+    DELETE FROM news_items
+    WHERE first_seen < LEAST(p_before, NOW() - INTERVAL '7 days');
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION prune_news_items(TIMESTAMPTZ) TO anon;
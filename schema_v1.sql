@@ -14,6 +14,7 @@ CREATE TABLE archives (
     date DATE NOT NULL,
     category TEXT NOT NULL,
     content TEXT,
+    rendered JSONB,  -- save_archive가 미리 렌더링한 HTML 조각 (schema_archives_rendered.sql 참고)
     UNIQUE(date, category)
 );
 
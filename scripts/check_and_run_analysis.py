@@ -27,15 +27,8 @@ else:
 services.db = services.init_supabase()
 
 def run_analysis_for_category(category):
-    print(f"\nChecking {category} archive for today...")
     today_str = datetime.date.today().strftime("%Y-%m-%d")
-    
-    archive = services.get_archive(today_str, category=category)
-    if archive:
-        print(f"✅ {category} archive for {today_str} already exists.")
-        return
-    
-    print(f"⚠️ {category} archive missing. Running analysis...")
+    print(f"\n⚠️ {category} archive for {today_str} missing. Running analysis...")
     
     # 1. Fetch Feeds
     urls = services.get_feeds(category=category)
@@ -69,5 +62,12 @@ def run_analysis_for_category(category):
         print("❌ Failed to generate summary")
 
 if __name__ == "__main__":
-    run_analysis_for_category("IT")
-    run_analysis_for_category("MVNO")
+    categories = ["IT", "MVNO"]
+    today_str = datetime.date.today().strftime("%Y-%m-%d")
+    print(f"Checking {', '.join(categories)} archives for today...")
+    missing = services.get_missing_categories(today_str, categories)
+    for category in categories:
+        if category not in missing:
+            print(f"✅ {category} archive for {today_str} already exists.")
+    for category in missing:
+        run_analysis_for_category(category)
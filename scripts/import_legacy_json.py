@@ -0,0 +1,73 @@
+"""
+import_legacy_json.py
+---------------------
+Supabase 이전에 쓰던 로컬 JSON 저장소(data/feeds.json, data/news_archive.json,
+data/stats.json)를 SQLite 저장소(STORAGE_BACKEND=sqlite)로 가져옵니다.
+
+실행 방법 (프로젝트 루트에서):
+    python scripts/import_legacy_json.py                 # data/newsroom.db
+    python scripts/import_legacy_json.py --db path.db
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import services
+
+def load_json(name):
+    path = os.path.join(ROOT, "data", name)
+    if not os.path.exists(path):
+        print(f"⚠️ {name} not found, skipping")
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def import_feeds(db):
+    feeds = load_json("feeds.json")
+    if not feeds:
+        return 0
+    # 예전 형식은 URL 리스트(IT 전용), 이후 형식은 {category: [urls]}
+    if isinstance(feeds, list):
+        feeds = {"IT": feeds}
+    count = 0
+    for category, urls in feeds.items():
+        for url in urls:
+            if db.insert("feeds", {"category": category, "url": url}) is not None:
+                count += 1
+    return count
+
+def import_archives(db):
+    archive = load_json("news_archive.json")
+    if not archive:
+        return 0
+    # news_archive.json 키는 "2026-02-04"(IT) 또는 "2026-02-04_MVNO" 형식
+    rows = []
+    for key, content in archive.items():
+        date_str, _, category = key.partition("_")
+        rows.append({"date": date_str, "category": category or "IT", "content": content,
+                     "rendered": services.render_briefing(content)})
+    return len(db.upsert("archives", rows, on_conflict="date,category") or [])
+
+def import_stats(db):
+    stats = load_json("stats.json")
+    if not stats:
+        return 0
+    db.upsert("global_stats", {"key": "total_views", "value": stats.get("total_views", 0)}, on_conflict="key")
+    rows = [{"date": d, "views": v} for d, v in stats.get("daily_views", {}).items()]
+    if rows:
+        db.upsert("daily_stats", rows, on_conflict="date")
+    return len(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import legacy JSON stores into the SQLite backend")
+    parser.add_argument("--db", default=services.SQLITE_DEFAULT_PATH, help="SQLite database path")
+    args = parser.parse_args()
+
+    db = services.SqliteClient(args.db)
+    print(f"📂 Importing legacy JSON into {args.db}")
+    print(f"✅ Feeds: {import_feeds(db)} added")
+    print(f"✅ Archives: {import_archives(db)} upserted")
+    print(f"✅ Daily stats: {import_stats(db)} days")
@@ -0,0 +1,222 @@
+"""
+postgrest_stub.py
+-----------------
+Supabase 없이 데이터 계층(services.SimpleSupabaseClient, auto_fetch.SupabaseClient)을
+테스트/벤치마크하기 위한 인프로세스 PostgREST 대체 서버입니다.
+저장소는 services.SqliteClient(:memory:)를 그대로 사용하므로 두 백엔드의 동작이 같습니다.
+
+지원 범위 (이 프로젝트가 쓰는 PostgREST 부분집합):
+    GET    /rest/v1/<table>?select=..&col=eq.v&or=(..)&order=col.desc&limit=n
+           (Prefer: count=exact|estimated -> Content-Range 헤더)
+    POST   /rest/v1/<table>                 insert, 중복 키면 409
+    POST   /rest/v1/<table>?on_conflict=a,b  Prefer: resolution=merge-duplicates|ignore-duplicates
+    PATCH  /rest/v1/<table>?col=eq.v
+    DELETE /rest/v1/<table>?col=eq.v
+    POST   /rest/v1/rpc/<function>          increment_views, get_view_stats, delete_comment
+
+사용 예:
+    stub = PostgrestStub(latency_ms=20, error_rate=0.05).start()
+    db = services.SimpleSupabaseClient(stub.url, "test-key")
+    ...
+    print(stub.stats())   # 라운드트립 수
+    stub.stop()
+
+단독 실행:
+    python scripts/postgrest_stub.py --port 54321 --latency-ms 20 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import services
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    server_version = "PostgrestStub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        payload = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _error(self, status, message, code=None):
+        self._send(status, {"code": code or str(status), "message": message, "details": None, "hint": None})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _prefer(self):
+        return {p.strip() for p in (self.headers.get("Prefer") or "").split(",") if p.strip()}
+
+    def _handle(self, method):
+        stub = self.server.stub
+        parts = urlsplit(self.path)
+        route = parts.path
+        # Drain the body first so an injected error still leaves the connection usable
+        try:
+            body = self._body() if method in ("POST", "PATCH") else None
+        except ValueError:
+            return self._error(400, "invalid JSON body", "PGRST102")
+        stub._record(method, route)
+        if stub.latency_ms:
+            time.sleep(stub.latency_ms / 1000.0)
+        if stub.error_rate and stub.rng.random() < stub.error_rate:
+            return self._error(503, "injected failure", "STUB503")
+
+        if not route.startswith("/rest/v1/"):
+            return self._error(404, f"unknown path {route}")
+        target = route[len("/rest/v1/"):]
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        prefer = self._prefer()
+        db = stub.db
+        try:
+            if target.startswith("rpc/"):
+                function = db.rpc_functions.get(target[4:])
+                if function is None:
+                    return self._error(404, f"function {target[4:]} not found", "PGRST202")
+                result = function(**(body or {}))
+                return self._send(204) if result is None else self._send(200, result)
+
+            if target not in services.SQLITE_PRIMARY_KEYS:
+                return self._error(404, f'relation "{target}" does not exist', "42P01")
+
+            if method == "GET":
+                rows = db.query(target, params)
+                headers = {}
+                if any(p.startswith("count=") for p in prefer):
+                    total = db.count(target, params)
+                    end = f"0-{len(rows) - 1}" if rows else "*"
+                    headers["Content-Range"] = f"{end}/{total}"
+                return self._send(200, rows, headers)
+
+            if method == "POST":
+                rows = db.write(
+                    target,
+                    body,
+                    on_conflict=params.get("on_conflict"),
+                    merge="resolution=merge-duplicates" in prefer,
+                    ignore_duplicates="resolution=ignore-duplicates" in prefer,
+                )
+                if params.get("select", "*") != "*":
+                    columns = [c.strip() for c in params["select"].split(",")]
+                    rows = [{c: row[c] for c in columns} for row in rows]
+                return self._send(201, rows if "return=representation" in prefer else None)
+
+            if method in ("PATCH", "DELETE"):
+                rows = db.modify(target, params, body if method == "PATCH" else None)
+                if "return=representation" in prefer:
+                    return self._send(200, rows)
+                return self._send(204)
+        except sqlite3.IntegrityError as e:
+            return self._error(409, f"duplicate key value violates unique constraint: {e}", "23505")
+        except (ValueError, TypeError, KeyError) as e:  # PostgrestQueryError is a ValueError
+            return self._error(400, str(e), "PGRST100")
+        except sqlite3.Error as e:
+            # Unknown column, malformed filter value, ...: answer like PostgREST does
+            # instead of dropping the connection
+            if "no such column" in str(e) or "has no column named" in str(e):
+                return self._error(400, str(e), "42703")  # Postgres undefined_column
+            return self._error(400, str(e), getattr(e, "sqlite_errorname", None) or "PGRST100")
+        return self._error(405, f"method {method} not allowed")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class PostgrestStub:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, error_rate=0.0, seed=None, db_path=":memory:"):
+        self.db = services.SqliteClient(db_path)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _record(self, method, route):
+        with self.lock:
+            key = f"{method} {route}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {"round_trips": sum(self.requests.values()), "by_route": dict(self.requests)}
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="postgrest-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local PostgREST stand-in for tests and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--db", default=":memory:", help="SQLite file to keep data between runs")
+    args = parser.parse_args()
+
+    stub = PostgrestStub(args.host, args.port, args.latency_ms, args.error_rate, args.seed, args.db)
+    print(f"🧪 PostgREST stub listening on {stub.url} (SUPABASE_URL={stub.url})")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Round trips: {stub.stats()['round_trips']}")
+        stub.httpd.server_close()
@@ -1,49 +1,170 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
+import re
+import atexit
+import bisect
+import hashlib
+import hmac
+import random
+import secrets
+import logging
+import sqlite3
+import sys
+import unicodedata
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import feedparser
+import httpx
+import numpy as np
+from html.parser import HTMLParser
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
 from google import genai
 from google.genai import types
+from google.genai import errors as genai_errors
+
+log = logging.getLogger(__name__)
 
 # ==========================================
-# 1. DATABASE SERVICE (Supabase REST API)
+# 1. DATABASE SERVICE (Supabase REST API / local SQLite)
 # ==========================================
 
+DB_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=DB_LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.total_ms = 0.0
+
+    def observe(self, elapsed_ms):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+            self.total_ms += elapsed_ms
+
+    def snapshot(self):
+        with self.lock:
+            counts = list(self.counts)
+            total_ms = self.total_ms
+        labels = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+        requests_count = sum(counts)
+        return {
+            "buckets": dict(zip(labels, counts)),
+            "count": requests_count,
+            "avg_ms": total_ms / requests_count if requests_count else 0.0,
+        }
+
+def postgrest_filter(value):
+    # Lists/tuples become PostgREST in.() filters, everything else an eq. filter.
+    if isinstance(value, (list, tuple, set)):
+        quoted = ",".join('"' + str(v).replace('"', '\\"') + '"' for v in value)
+        return f"in.({quoted})"
+    return f"eq.{value}"
+
+def is_missing_column_response(response):
+    # A write naming a column the table doesn't have: PostgREST answers 400 with
+    # PGRST204 (not in its schema cache) or passes on Postgres' 42703 (undefined_column).
+    if response is None or response.status_code != 400:
+        return False
+    try:
+        return response.json().get("code") in ("PGRST204", "42703")
+    except ValueError:
+        return False
+
+def _select_params(select, order, limit, filters, kwargs):
+    params = {"select": select}
+    for k, v in kwargs.items():
+        params[k] = postgrest_filter(v)
+    if filters:
+        params.update(filters)  # raw PostgREST filters, e.g. {"or": "(a.lt.1,b.eq.2)"}
+    if order:
+        params["order"] = order
+    if limit:
+        params["limit"] = limit
+    return params
+
 class SimpleSupabaseClient:
-    def __init__(self, url, key):
+    def __init__(self, url, key, pool_size=10, timeout=(3.05, 10), read_retries=2):
         self.url = url.rstrip("/")
         self.headers = {
             "apikey": key,
             "Authorization": f"Bearer {key}",
             "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
             "Prefer": "return=representation"
         }
+        self.timeout = timeout
+        # One keep-alive pool per client; init_supabase's cache_resource shares it
+        # across Streamlit sessions. Only idempotent reads are retried.
+        retry = Retry(
+            total=read_retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.latency = LatencyHistogram()
+        self.missing_functions = set()  # rpc names the server reported as not found
+        self.missing_columns = set()    # tables whose last upsert named an unknown column
 
     def _get_url(self, table):
         return f"{self.url}/rest/v1/{table}"
 
-    def select(self, table, select="*", order=None, limit=None, **kwargs):
-        params = {"select": select}
-        for k, v in kwargs.items():
-            params[k] = f"eq.{v}"
-        if order:
-            params["order"] = order
-        if limit:
-            params["limit"] = limit
+    def _request(self, method, table, headers=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.session.request(
+                method, self._get_url(table), headers=headers or self.headers, timeout=self.timeout, **kwargs
+            )
+        finally:
+            self.latency.observe((time.perf_counter() - started) * 1000)
+
+    def latency_histogram(self):
+        return self.latency.snapshot()
+
+    def select(self, table, select="*", order=None, limit=None, filters=None, **kwargs):
+        params = _select_params(select, order, limit, filters, kwargs)
         try:
-            response = requests.get(self._get_url(table), headers=self.headers, params=params)
+            response = self._request("GET", table, params=params)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Supabase Select Error: {e}")
             return []
 
-    def insert(self, table, data):
+    def select_with_count(self, table, select="*", order=None, limit=None, filters=None,
+                          count="estimated", **kwargs):
+        # Returns (rows, total) with total taken from the Content-Range header.
+        params = _select_params(select, order, limit, filters, kwargs)
+        headers = self.headers.copy()
+        headers["Prefer"] = f"count={count}"
         try:
-            response = requests.post(self._get_url(table), headers=self.headers, json=data)
+            response = self._request("GET", table, headers=headers, params=params)
+            response.raise_for_status()
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            return response.json(), int(total) if total.isdigit() else None
+        except Exception as e:
+            print(f"Supabase Select Error: {e}")
+            return [], None
+
+    def insert(self, table, data, select=None):
+        # `select` limits the returned columns (needed where anon may not read them all)
+        try:
+            response = self._request("POST", table, json=data, params={"select": select} if select else None)
             if response.status_code == 409:
                 return None
             response.raise_for_status()
@@ -59,19 +180,36 @@ class SimpleSupabaseClient:
         if on_conflict:
             params["on_conflict"] = on_conflict
         try:
-            response = requests.post(self._get_url(table), headers=headers, json=data, params=params)
+            response = self._request("POST", table, headers=headers, json=data, params=params)
+            if is_missing_column_response(response):
+                self.missing_columns.add(table)
+            else:
+                self.missing_columns.discard(table)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Supabase Upsert Error: {e}")
             return None
 
+    def insert_new(self, table, data, on_conflict=None):
+        # INSERT ... ON CONFLICT DO NOTHING; returns only the rows that were actually inserted.
+        headers = self.headers.copy()
+        headers["Prefer"] = "return=representation,resolution=ignore-duplicates"
+        params = {"on_conflict": on_conflict} if on_conflict else {}
+        try:
+            response = self._request("POST", table, headers=headers, json=data, params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Supabase Insert Error: {e}")
+            return None
+
     def delete(self, table, **kwargs):
         params = {}
         for k, v in kwargs.items():
-            params[k] = f"eq.{v}"
+            params[k] = postgrest_filter(v)
         try:
-            response = requests.delete(self._get_url(table), headers=self.headers, params=params)
+            response = self._request("DELETE", table, params=params)
             response.raise_for_status()
             return True
         except Exception as e:
@@ -81,17 +219,455 @@ class SimpleSupabaseClient:
     def update(self, table, data, **kwargs):
         params = {}
         for k, v in kwargs.items():
-            params[k] = f"eq.{v}"
+            params[k] = postgrest_filter(v)
         try:
-            response = requests.patch(self._get_url(table), headers=self.headers, json=data, params=params)
+            response = self._request("PATCH", table, json=data, params=params)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Supabase Update Error: {e}")
             return None
 
+    def rpc(self, function, params=None):
+        try:
+            response = self._request("POST", f"rpc/{function}", json=params or {})
+            if response.status_code == 404 or '"PGRST202"' in response.text:
+                self.missing_functions.add(function)
+            response.raise_for_status()
+            data = response.json() if response.content else None
+            return True if data is None else data  # void functions answer 204 / null
+        except Exception as e:
+            print(f"Supabase RPC Error ({function}): {e}")
+            return None
+
+# ------------------------------------------
+# Local SQLite backend (STORAGE_BACKEND=sqlite)
+# ------------------------------------------
+# Same interface as SimpleSupabaseClient, for single-node deployments, offline
+# development and tests. Queries are expressed as PostgREST-style params and
+# translated to SQL, so the subset the app uses behaves the same on both backends.
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now') || '+00:00'),
+    category TEXT NOT NULL,
+    url TEXT NOT NULL,
+    UNIQUE(category, url)
+);
+CREATE TABLE IF NOT EXISTS archives (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now') || '+00:00'),
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    content TEXT,
+    rendered TEXT,
+    UNIQUE(date, category)
+);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    date TEXT PRIMARY KEY,
+    views INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS global_stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS comments (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now') || '+00:00'),
+    page_id TEXT NOT NULL,
+    nickname TEXT NOT NULL,
+    password TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_page_idx ON comments (page_id, created_at, id);
+CREATE TABLE IF NOT EXISTS news_items (
+    id TEXT PRIMARY KEY,
+    feed_url TEXT NOT NULL,
+    guid TEXT,
+    title TEXT NOT NULL,
+    link TEXT,
+    summary TEXT,
+    source TEXT,
+    published TEXT,
+    published_at TEXT,
+    first_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS news_items_feed_seen_idx ON news_items (feed_url, first_seen);
+CREATE INDEX IF NOT EXISTS news_items_first_seen_idx ON news_items (first_seen);
+CREATE TABLE IF NOT EXISTS feed_cursors (
+    category TEXT NOT NULL,
+    feed_url TEXT NOT NULL,
+    seen_until TEXT NOT NULL,
+    last_success_at TEXT NOT NULL,
+    PRIMARY KEY (category, feed_url)
+);
+INSERT OR IGNORE INTO global_stats (key, value) VALUES ('total_views', 0);
+"""
+SQLITE_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "newsroom.db")
+SQLITE_PRIMARY_KEYS = {
+    "feeds": "id", "archives": "id", "daily_stats": "date", "global_stats": "key", "comments": "id",
+    "news_items": "id", "feed_cursors": "category,feed_url",
+}
+SQLITE_JSON_COLUMNS = {"archives": {"rendered"}}
+SQLITE_DEFAULTS = {"comments": {"id": lambda: str(uuid.uuid4())}}
+# Column rewrites applied on INSERT, like the BEFORE INSERT trigger in schema_comments_delete.sql
+SQLITE_INSERT_HOOKS = {"comments": {"password": lambda value: hash_comment_password(value)}}
+
+_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_SQL_OPS = {"eq": "=", "neq": "!=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">=", "like": "LIKE"}
+
+class PostgrestQueryError(ValueError):
+    pass
+
+def _ident(name):
+    if not _IDENT_RE.match(name):
+        raise PostgrestQueryError(f"invalid identifier: {name!r}")
+    # [name] rather than "name": SQLite reads an unknown "name" as a string literal,
+    # which would turn a typo'd column into a silent constant instead of an error
+    return f"[{name}]"
+
+def _split_top_level(text):
+    # Splits "a.eq.1,and(b.eq.2,c.eq.3),d.eq.\"x,y\"" on commas outside () and quotes.
+    parts, depth, quoted, escaped, current = [], 0, False, False, []
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif quoted and ch == "\\":
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+def _condition_sql(column, expression):
+    # Translates one PostgREST "op.value" expression for `column` into SQL + args.
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    col = _ident(column)
+    if op == "in":
+        values = [_unquote(v) for v in _split_top_level(value.strip()[1:-1])] if value.strip() else []
+        sql = f"{col} IN ({', '.join('?' for _ in values)})" if values else "0"
+        args = values
+    elif op == "is":
+        sql = {"null": f"{col} IS NULL", "true": f"{col} = 1", "false": f"{col} = 0"}.get(value)
+        if sql is None:
+            raise PostgrestQueryError(f"unsupported is. value: {value!r}")
+        args = []
+    elif op in _SQL_OPS:
+        value = _unquote(value)
+        if op == "like":
+            value = value.replace("*", "%")
+        sql, args = f"{col} {_SQL_OPS[op]} ?", [value]
+    else:
+        raise PostgrestQueryError(f"unsupported operator: {op!r}")
+    return (f"NOT ({sql})" if negate else sql), args
+
+def _logic_sql(joiner, body):
+    # body is the inside of or=(...) / and(...): comma separated conditions or nested groups
+    clauses, args = [], []
+    for part in _split_top_level(body):
+        part = part.strip()
+        for nested in ("and", "or"):
+            if part.startswith(nested + "(") and part.endswith(")"):
+                sql, part_args = _logic_sql(nested.upper(), part[len(nested) + 1:-1])
+                break
+        else:
+            column, _, expression = part.partition(".")
+            sql, part_args = _condition_sql(column, expression)
+        clauses.append(f"({sql})")
+        args.extend(part_args)
+    return f" {joiner} ".join(clauses) or "1", args
+
+def _where_sql(params):
+    clauses, args = [], []
+    for key, value in params.items():
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        if key in ("or", "and"):
+            sql, part_args = _logic_sql(key.upper(), value.strip()[1:-1])
+        else:
+            sql, part_args = _condition_sql(key, value)
+        clauses.append(f"({sql})")
+        args.extend(part_args)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+def _order_sql(order):
+    if not order:
+        return ""
+    terms = []
+    for term in order.split(","):
+        column, *modifiers = term.strip().split(".")
+        direction = "DESC" if "desc" in modifiers else "ASC"
+        nulls = " NULLS LAST" if "nullslast" in modifiers else " NULLS FIRST" if "nullsfirst" in modifiers else ""
+        terms.append(f"{_ident(column)} {direction}{nulls}")
+    return " ORDER BY " + ", ".join(terms)
+
+class SqliteClient:
+    def __init__(self, path=":memory:"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL" if path != ":memory:" else "PRAGMA journal_mode=MEMORY")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.lock = threading.RLock()
+        self.latency = LatencyHistogram()
+        self.rpc_functions = {
+            "increment_views": self._rpc_increment_views,
+            "get_view_stats": self._rpc_get_view_stats,
+            "delete_comment": self._rpc_delete_comment,
+            "prune_news_items": self._rpc_prune_news_items,
+        }
+        self.missing_functions = set()
+        self.missing_columns = set()
+
+    def latency_histogram(self):
+        return self.latency.snapshot()
+
+    def _table(self, table):
+        if table not in SQLITE_PRIMARY_KEYS:
+            raise PostgrestQueryError(f"unknown table: {table!r}")
+        return _ident(table)
+
+    def _execute(self, sql, args=()):
+        started = time.perf_counter()
+        try:
+            with self.lock:
+                return self.conn.execute(sql, args).fetchall()
+        finally:
+            self.latency.observe((time.perf_counter() - started) * 1000)
+
+    def _decode(self, table, rows):
+        json_columns = SQLITE_JSON_COLUMNS.get(table, ())
+        result = []
+        for row in rows:
+            item = dict(row)
+            for column in json_columns:
+                if isinstance(item.get(column), str):
+                    item[column] = json.loads(item[column])
+            result.append(item)
+        return result
+
+    def _encode(self, table, row):
+        row = dict(row)
+        for column in SQLITE_JSON_COLUMNS.get(table, ()):
+            if column in row and row[column] is not None and not isinstance(row[column], str):
+                row[column] = json.dumps(row[column], ensure_ascii=False)
+        for column, default in SQLITE_DEFAULTS.get(table, {}).items():
+            row.setdefault(column, default())
+        return row
+
+    def _columns(self, select):
+        if select in (None, "", "*"):
+            return "*"
+        return ", ".join(_ident(column.strip()) for column in select.split(","))
+
+    # --- PostgREST-style entry points (also used by scripts/postgrest_stub.py) ---
+
+    def query(self, table, params):
+        params = dict(params)
+        where, args = _where_sql(params)
+        sql = f"SELECT {self._columns(params.get('select'))} FROM {self._table(table)}{where}"
+        sql += _order_sql(params.get("order"))
+        if params.get("limit") is not None:
+            sql += " LIMIT ?"
+            args.append(int(params["limit"]))
+            if params.get("offset") is not None:
+                sql += " OFFSET ?"
+                args.append(int(params["offset"]))
+        return self._decode(table, self._execute(sql, args))
+
+    def count(self, table, params):
+        where, args = _where_sql(params)
+        return self._execute(f"SELECT COUNT(*) FROM {self._table(table)}{where}", args)[0][0]
+
+    def write(self, table, data, on_conflict=None, merge=False, ignore_duplicates=False):
+        # INSERT, upsert (merge=True) or insert-if-absent (ignore_duplicates=True, only the
+        # new rows are returned); a plain INSERT raises sqlite3.IntegrityError on conflicts.
+        rows = [self._encode(table, row) for row in (data if isinstance(data, list) else [data])]
+        for row in rows:
+            for column, hook in SQLITE_INSERT_HOOKS.get(table, {}).items():
+                if row.get(column) is not None:
+                    row[column] = hook(row[column])
+        inserted = []
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    columns = list(row)
+                    sql = (f"INSERT INTO {self._table(table)} ({', '.join(_ident(c) for c in columns)}) "
+                           f"VALUES ({', '.join('?' for _ in columns)})")
+                    if merge or ignore_duplicates:
+                        conflict = [c.strip() for c in (on_conflict or SQLITE_PRIMARY_KEYS[table]).split(",")]
+                        updates = [] if ignore_duplicates else [c for c in columns if c not in conflict]
+                        sql += f" ON CONFLICT ({', '.join(_ident(c) for c in conflict)}) DO "
+                        sql += ("UPDATE SET " + ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in updates)
+                                if updates else "NOTHING")
+                    inserted.extend(self._execute(sql + " RETURNING *", [row[c] for c in columns]))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self._decode(table, inserted)
+
+    def modify(self, table, params, data=None):
+        # PATCH when data is given, DELETE otherwise; returns the affected rows.
+        where, args = _where_sql(params)
+        if data is None:
+            sql = f"DELETE FROM {self._table(table)}{where} RETURNING *"
+        else:
+            data = self._encode(table, data)
+            data = {k: v for k, v in data.items() if k not in SQLITE_DEFAULTS.get(table, {})}
+            sets = ", ".join(f"{_ident(c)} = ?" for c in data)
+            sql = f"UPDATE {self._table(table)} SET {sets}{where} RETURNING *"
+            args = list(data.values()) + args
+        return self._decode(table, self._execute(sql, args))
+
+    # --- SimpleSupabaseClient interface ---
+
+    def select(self, table, select="*", order=None, limit=None, filters=None, **kwargs):
+        try:
+            return self.query(table, _select_params(select, order, limit, filters, kwargs))
+        except Exception as e:
+            print(f"SQLite Select Error: {e}")
+            return []
+
+    def select_with_count(self, table, select="*", order=None, limit=None, filters=None,
+                          count="exact", **kwargs):
+        params = _select_params(select, order, limit, filters, kwargs)
+        try:
+            return self.query(table, params), self.count(table, params)
+        except Exception as e:
+            print(f"SQLite Select Error: {e}")
+            return [], None
+
+    def insert(self, table, data, select=None):
+        try:
+            rows = self.write(table, data)
+            if select:
+                columns = [c.strip() for c in select.split(",")]
+                rows = [{c: row[c] for c in columns} for row in rows]
+            return rows
+        except sqlite3.IntegrityError:
+            return None
+        except Exception as e:
+            print(f"SQLite Insert Error: {e}")
+            return None
+
+    def upsert(self, table, data, on_conflict=None):
+        self.missing_columns.discard(table)
+        try:
+            return self.write(table, data, on_conflict=on_conflict, merge=True)
+        except Exception as e:
+            if isinstance(e, sqlite3.OperationalError) and "has no column named" in str(e):
+                self.missing_columns.add(table)
+            print(f"SQLite Upsert Error: {e}")
+            return None
+
+    def insert_new(self, table, data, on_conflict=None):
+        try:
+            return self.write(table, data, on_conflict=on_conflict, ignore_duplicates=True)
+        except Exception as e:
+            print(f"SQLite Insert Error: {e}")
+            return None
+
+    def delete(self, table, **kwargs):
+        try:
+            self.modify(table, {k: postgrest_filter(v) for k, v in kwargs.items()})
+            return True
+        except Exception as e:
+            print(f"SQLite Delete Error: {e}")
+            return False
+
+    def update(self, table, data, **kwargs):
+        try:
+            return self.modify(table, {k: postgrest_filter(v) for k, v in kwargs.items()}, data)
+        except Exception as e:
+            print(f"SQLite Update Error: {e}")
+            return None
+
+    def rpc(self, function, params=None):
+        if function not in self.rpc_functions:
+            self.missing_functions.add(function)
+            print(f"SQLite RPC Error ({function}): function not found")
+            return None
+        try:
+            result = self.rpc_functions[function](**(params or {}))
+            return True if result is None else result
+        except Exception as e:
+            print(f"SQLite RPC Error ({function}): {e}")
+            return None
+
+    # --- Python versions of the SQL functions in schema_counters.sql, schema_comments_delete.sql
+    #     and schema_news_items.sql ---
+
+    def _rpc_increment_views(self, p_date, p_count=1):
+        # isolation_level=None means autocommit: both upserts go in one explicit
+        # transaction, like the single SQL function this stands in for
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self._execute("INSERT INTO global_stats (key, value) VALUES ('total_views', ?) "
+                              "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value", [p_count])
+                self._execute("INSERT INTO daily_stats (date, views) VALUES (?, ?) "
+                              "ON CONFLICT (date) DO UPDATE SET views = views + excluded.views", [p_date, p_count])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _rpc_get_view_stats(self, p_days=30):
+        total = self._execute("SELECT value FROM global_stats WHERE key = 'total_views'")
+        daily = self._execute("SELECT date, views FROM daily_stats ORDER BY date DESC LIMIT ?", [p_days])
+        return {"total_views": total[0][0] if total else 0, "daily_views": {r[0]: r[1] for r in daily}}
+
+    def _rpc_prune_news_items(self, p_before):
+        floor = (datetime.now(timezone.utc) - NEWS_ITEM_MIN_RETENTION).isoformat(timespec="milliseconds")
+        return len(self._execute("DELETE FROM news_items WHERE first_seen < ? RETURNING id", [min(p_before, floor)]))
+
+    def _rpc_delete_comment(self, p_id, p_password):
+        with self.lock:
+            rows = self._execute("SELECT password FROM comments WHERE id = ?", [p_id])
+            if not rows:
+                return False
+            ok = check_comment_password(p_password, rows[0][0])
+            if ok:
+                self._execute("DELETE FROM comments WHERE id = ?", [p_id])
+            return ok
+
+def _config(name, default=None):
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    if value is None:
+        value = os.environ.get(name, default)
+    return value
+
 @st.cache_resource(show_spinner=False)
 def init_supabase():
+    # STORAGE_BACKEND=sqlite keeps everything in a local database file instead of Supabase
+    if str(_config("STORAGE_BACKEND", "supabase")).lower() == "sqlite":
+        return SqliteClient(_config("SQLITE_PATH", SQLITE_DEFAULT_PATH))
     try:
         url = st.secrets.get("SUPABASE_URL")
         key = st.secrets.get("SUPABASE_KEY")
@@ -100,75 +676,491 @@ def init_supabase():
         key = os.environ.get("SUPABASE_KEY")
     if not url or not key:
         return None
-    return SimpleSupabaseClient(url, key)
+    return SimpleSupabaseClient(
+        url,
+        key,
+        pool_size=int(_config("SUPABASE_POOL_SIZE", 10)),
+        timeout=(float(_config("SUPABASE_CONNECT_TIMEOUT", 3.05)), float(_config("SUPABASE_READ_TIMEOUT", 10))),
+        read_retries=int(_config("SUPABASE_READ_RETRIES", 2)),
+    )
+
+def get_db_latency_histogram():
+    if not db: return None
+    return db.latency_histogram()
 
 db = init_supabase()
 
+CATEGORIES = ["IT", "MVNO", "KSTARTUP", "VIBECODING"]
+
+# Process-wide read cache: Streamlit reruns the script on every click, but the
+# services module (and this cache) lives for the whole server process.
+READ_CACHE_TTL = {
+    "feeds": 300,
+    "archive_today": 60,
+    "archive_past": None,      # past dates never change -> cache until invalidated
+    "archive_missing": 60,     # a missing briefing may still be backfilled
+    "stats": 15,
+}
+
+class ReadCache:
+    _MISSING = object()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self.hits += 1
+                return entry[1]
+            self.entries.pop(key, None)
+            self.misses += 1
+            return self._MISSING
+
+    def contains(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def set(self, key, value, ttl):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+
+    def invalidate(self, *prefix):
+        with self.lock:
+            for key in [k for k in self.entries if k[:len(prefix)] == prefix]:
+                del self.entries[key]
+
+    def cached(self, key, ttl, loader):
+        value = self.get(key)
+        if value is self._MISSING:
+            value = loader()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+read_cache = ReadCache()
+
+def _archive_ttl(date_str, row):
+    if row is None:
+        return READ_CACHE_TTL["archive_missing"]
+    if date_str < datetime.now().strftime("%Y-%m-%d"):
+        return READ_CACHE_TTL["archive_past"]
+    return READ_CACHE_TTL["archive_today"]
+
 def get_feeds(category="IT"):
     if not db: return []
-    data = db.select("feeds", category=category)
-    return [item['url'] for item in data]
+    def load():
+        data = db.select("feeds", category=category)
+        return [item['url'] for item in data]
+    return list(read_cache.cached(("feeds", category), READ_CACHE_TTL["feeds"], load))
 
 def add_feed(url, category="IT"):
     if not db: return False
     existing = db.select("feeds", category=category, url=url)
     if existing: return False
     res = db.insert("feeds", {"category": category, "url": url})
+    read_cache.invalidate("feeds", category)
     if res is None: return False
     return True
 
 def remove_feed(url, category="IT"):
     if not db: return False
-    return db.delete("feeds", category=category, url=url)
+    result = db.delete("feeds", category=category, url=url)
+    read_cache.invalidate("feeds", category)
+    return result
+
+# Incremental news item store (schema_news_items.sql): each feed entry is stored once,
+# keyed by feed + entry GUID/link, with the time it was first seen. Every (category, feed)
+# pair keeps a cursor at the newest first_seen it has briefed, so a run only analyzes
+# entries that arrived since that category's last successful run.
+NEWS_ITEM_COLUMNS = "id,feed_url,guid,title,link,summary,source,published,published_at,first_seen"
+NEWS_ITEM_BATCH_SIZE = 500
+# A feed without a cursor for the category (new, or just added to it) starts with
+# entries first seen in this window instead of everything ever stored for its URL.
+NEWS_CURSOR_BOOTSTRAP = timedelta(days=1)
+# Rows first seen longer ago than this are pruned after each run. Entries published
+# before the window aren't stored at all, so a pruned entry that is still listed in
+# its feed doesn't come back as new. The SQL function never prunes the last 7 days.
+NEWS_ITEM_RETENTION = timedelta(days=int(os.environ.get("NEWS_ITEM_RETENTION_DAYS", 30)))
+NEWS_ITEM_MIN_RETENTION = timedelta(days=7)
+
+def _quoted(value):
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+def news_item_id(feed_url, item):
+    # Same story in two feeds gets two rows; cluster_news_items merges them later
+    key = item.get('guid') or item.get('link') or item.get('title') or ''
+    return hashlib.sha256(f"{feed_url}\n{key}".encode("utf-8")).hexdigest()[:32]
+
+def store_news_items(feed_map, client=None, first_seen=None):
+    # Inserts entries not stored yet; returns {feed_url: new entry count}, or None on failure.
+    client = client or db
+    if not client: return None
+    first_seen = first_seen or datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    published_after = (datetime.now(timezone.utc) - NEWS_ITEM_RETENTION).isoformat(timespec="seconds")
+    rows = {}
+    for feed_url, items in feed_map.items():
+        for item in map(as_news_item, items):
+            if item.published_at and item.published_at < published_after:
+                continue
+            row_id = news_item_id(feed_url, item)
+            rows.setdefault(row_id, {
+                "id": row_id,
+                "feed_url": feed_url,
+                "guid": item.guid or None,
+                "title": item.title,
+                "link": item.link,
+                "summary": item.summary,
+                "source": item.source,
+                "published": item.published or None,
+                "published_at": item.published_at,
+                "first_seen": first_seen,
+            })
+    rows = list(rows.values())
+    counts = {feed_url: 0 for feed_url in feed_map}
+    for start in range(0, len(rows), NEWS_ITEM_BATCH_SIZE):
+        inserted = client.insert_new("news_items", rows[start:start + NEWS_ITEM_BATCH_SIZE])
+        if inserted is None:
+            return None
+        for row in inserted:
+            counts[row['feed_url']] = counts.get(row['feed_url'], 0) + 1
+    return counts
+
+def prune_news_items(client=None, retention=NEWS_ITEM_RETENTION):
+    # Deletes rows first seen before the retention window (rpc/prune_news_items);
+    # returns the number of rows deleted, or None on failure.
+    client = client or db
+    if not client: return None
+    before = (datetime.now(timezone.utc) - retention).isoformat(timespec="milliseconds")
+    return client.rpc("prune_news_items", {"p_before": before})
+
+def get_feed_cursors(category, feed_urls, client=None):
+    client = client or db
+    if not client or not feed_urls: return {}
+    rows = client.select("feed_cursors", select="feed_url,seen_until", category=category, feed_url=list(feed_urls))
+    return {row['feed_url']: row['seen_until'] for row in rows}
+
+def get_new_news_items(category, feed_urls, client=None, since=None):
+    # Entries of `feed_urls` first seen after each feed's cursor for `category` (or
+    # after `since` for every feed, e.g. to re-run today's briefing), newest first.
+    client = client or db
+    feed_urls = list(dict.fromkeys(feed_urls))
+    if not client or not feed_urls: return []
+    order = "published_at.desc.nullslast,first_seen.desc"
+    if since is not None:
+        rows = client.select("news_items", select=NEWS_ITEM_COLUMNS, order=order,
+                             filters={"first_seen": f"gte.{since}"}, feed_url=feed_urls)
+        return [NewsItem.from_dict(row) for row in rows]
+    cursors = get_feed_cursors(category, feed_urls, client)
+    conditions = [
+        f"and(feed_url.eq.{_quoted(u)},first_seen.gt.{_quoted(cursors[u])})"
+        for u in feed_urls if cursors.get(u)
+    ]
+    fresh = [u for u in feed_urls if not cursors.get(u)]
+    if fresh:
+        window = (datetime.now(timezone.utc) - NEWS_CURSOR_BOOTSTRAP).isoformat(timespec="milliseconds")
+        conditions.append(f"and(feed_url.{postgrest_filter(fresh)},first_seen.gte.{_quoted(window)})")
+    rows = client.select("news_items", select=NEWS_ITEM_COLUMNS, order=order,
+                         filters={"or": f"({','.join(conditions)})"})
+    return [NewsItem.from_dict(row) for row in rows]
+
+def advance_feed_cursors(category, news_items, client=None):
+    # Moves each feed's cursor to the newest first_seen among the briefed entries
+    client = client or db
+    latest = {}
+    for item in news_items:
+        feed_url, seen = item.feed_url, item.first_seen
+        if feed_url and seen and seen > latest.get(feed_url, ""):
+            latest[feed_url] = seen
+    if not client or not latest: return False
+    now = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    rows = [
+        {"category": category, "feed_url": feed_url, "seen_until": seen, "last_success_at": now}
+        for feed_url, seen in latest.items()
+    ]
+    return client.upsert("feed_cursors", rows, on_conflict="category,feed_url") is not None
+
+# Briefings are rendered to HTML fragments once, at save time, and stored in the
+# archives.rendered column (schema_archives_rendered.sql). Bump the version when
+# clean_text/render_briefing output changes; older rows are re-rendered on read.
+BRIEFING_SCHEMA_VERSION = 1
+BRIEFING_SECTIONS = ("headline", "trends", "insight")
+_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+
+def clean_text(text):
+    if not text:
+        return ""
+    cleaned = str(text).strip()
+    if cleaned.startswith("['") and cleaned.endswith("']"):
+        cleaned = cleaned[2:-2]
+    elif cleaned.startswith('["') and cleaned.endswith('"]'):
+        cleaned = cleaned[2:-2]
+    cleaned = cleaned.replace("\\n", "\n")
+    cleaned = _BOLD_RE.sub(r'<strong>\1</strong>', cleaned)
+    return cleaned
+
+def render_briefing(content):
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        data = None
+    if not isinstance(data, dict):
+        # Legacy markdown rows (e.g. 2026-02-03) are shown as-is
+        return {"schema": BRIEFING_SCHEMA_VERSION, "markdown": content or ""}
+    rendered = {"schema": BRIEFING_SCHEMA_VERSION}
+    for section in BRIEFING_SECTIONS:
+        rendered[section] = clean_text(data.get(section, ""))
+    return rendered
+
+def _archive_row(date_str, category):
+    def load():
+        data = db.select("archives", date=date_str, category=category)
+        if data: return data[0]
+        return None
+    return read_cache.cached(
+        ("archive", date_str, category),
+        lambda row: _archive_ttl(date_str, row),
+        load,
+    )
 
 def get_archive(date_str, category="IT"):
     if not db: return None
-    data = db.select("archives", select="content", date=date_str, category=category)
-    if data: return data[0]['content']
-    return None
+    row = _archive_row(date_str, category)
+    return row['content'] if row else None
+
+def get_briefing(date_str, category="IT"):
+    if not db: return None
+    row = _archive_row(date_str, category)
+    if not row or not row.get('content'):
+        return None
+    rendered = row.get('rendered')
+    if isinstance(rendered, str):
+        try:
+            rendered = json.loads(rendered)
+        except ValueError:
+            rendered = None
+    if not isinstance(rendered, dict) or rendered.get("schema") != BRIEFING_SCHEMA_VERSION:
+        # Old row without a (current) pre-rendered form: render live once and memoize
+        rendered = render_briefing(row['content'])
+        row['rendered'] = rendered
+    return rendered
+
+def get_archives_bulk(date_str, categories=None, adjacent_days=0):
+    # One request for every category of `date_str` (and optionally the days around
+    # it); every (date, category) pair, including missing ones, lands in read_cache.
+    categories = list(categories or CATEGORIES)
+    if not db: return {category: None for category in categories}
+    day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    today = datetime.now().date()
+    dates = [
+        (day + timedelta(days=offset)).strftime("%Y-%m-%d")
+        for offset in range(-adjacent_days, adjacent_days + 1)
+        if day + timedelta(days=offset) <= today
+    ] or [date_str]
+    rows = db.select("archives", date=dates, category=categories)
+    found = {(row['date'], row['category']): row for row in rows}
+    for d in dates:
+        for category in categories:
+            row = found.get((d, category))
+            read_cache.set(("archive", d, category), row, _archive_ttl(d, row))
+    return {
+        category: found[(date_str, category)]['content'] if (date_str, category) in found else None
+        for category in categories
+    }
+
+def prefetch_archives(date_str, categories=None, adjacent_days=1):
+    categories = list(categories or CATEGORIES)
+    if all(read_cache.contains(("archive", date_str, c)) for c in categories):
+        return
+    get_archives_bulk(date_str, categories, adjacent_days=adjacent_days)
+
+def get_missing_categories(date_str, categories=None):
+    archives = get_archives_bulk(date_str, categories)
+    return [category for category, content in archives.items() if not content]
 
 def save_archive(date_str, content, category="IT"):
     if not db: return
-    data = {"date": date_str, "category": category, "content": content}
-    db.upsert("archives", data, on_conflict="date,category")
+    data = {"date": date_str, "category": category, "content": content, "rendered": render_briefing(content)}
+    if db.upsert("archives", data, on_conflict="date,category") is None and "archives" in db.missing_columns:
+        # Database without the rendered column yet (schema_archives_rendered.sql): store the
+        # raw JSON only. Other failures (network, 5xx) are not retried with less data.
+        data.pop("rendered")
+        db.upsert("archives", data, on_conflict="date,category")
+    read_cache.invalidate("archive", date_str, category)
+
+class ViewCounter:
+    # Page views are buffered in-process and flushed as one atomic server-side
+    # increment (rpc/increment_views, see schema_counters.sql) per date and interval.
+    # Flushes happen on the next increment once the interval has passed, from a
+    # background timer and at exit; a worker killed with SIGKILL still loses up to
+    # one interval of buffered views.
+    def __init__(self, client, flush_interval=30):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush)
+        if flush_interval > 0:
+            threading.Thread(target=self._flush_loop, name="view-counter-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            with self.lock:
+                due = self.pending and time.monotonic() - self.last_flush >= self.flush_interval
+            if due:
+                self.flush()
+
+    def increment(self, count=1):
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self.lock:
+            self.pending[today] = self.pending.get(today, 0) + count
+            due = time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        for date_str, count in pending.items():
+            if self.client.rpc("increment_views", {"p_date": date_str, "p_count": count}) is not None:
+                continue
+            # Only a database without the function gets the read-modify-write path. Any
+            # other failure (e.g. a timeout after the server committed) is retried on the
+            # next flush: a rare double count beats bringing back the lost-update race.
+            if "increment_views" in self.client.missing_functions and self._legacy_increment(date_str, count):
+                continue
+            with self.lock:
+                self.pending[date_str] = self.pending.get(date_str, 0) + count
+
+    def _legacy_increment(self, date_str, count):
+        # Read-modify-write fallback for databases without the increment_views function.
+        curr_global = self.client.select("global_stats", key="total_views")
+        if curr_global:
+            ok = self.client.update("global_stats", {"value": curr_global[0]['value'] + count}, key="total_views")
+        else:
+            ok = self.client.insert("global_stats", {"key": "total_views", "value": count})
+        if ok is None:
+            return False
+        curr_daily = self.client.select("daily_stats", date=date_str)
+        if curr_daily:
+            self.client.update("daily_stats", {"views": curr_daily[0]['views'] + count}, date=date_str)
+        else:
+            self.client.insert("daily_stats", {"date": date_str, "views": count})
+        return True
+
+    def stats(self, days=30):
+        data = self.client.rpc("get_view_stats", {"p_days": days})
+        if isinstance(data, dict):
+            total_views = data.get("total_views") or 0
+            daily_views = dict(data.get("daily_views") or {})
+        else:
+            g_data = self.client.select("global_stats", key="total_views")
+            total_views = g_data[0]['value'] if g_data else 0
+            d_data = self.client.select("daily_stats", order="date.desc", limit=days)
+            daily_views = {item['date']: item['views'] for item in d_data}
+        # Include views that are still buffered so the sidebar never lags behind
+        with self.lock:
+            for date_str, count in self.pending.items():
+                total_views += count
+                daily_views[date_str] = daily_views.get(date_str, 0) + count
+        return {"total_views": total_views, "daily_views": daily_views}
+
+@st.cache_resource(show_spinner=False)
+def init_view_counter():
+    if not db: return None
+    return ViewCounter(db, flush_interval=float(_config("VIEW_FLUSH_INTERVAL", 30)))
+
+view_counter = init_view_counter()
 
 def get_stats():
-    if not db: return {"total_views": 0, "daily_views": {}}
-    g_data = db.select("global_stats", key="total_views")
-    total_views = g_data[0]['value'] if g_data else 0
-    d_data = db.select("daily_stats", order="date.desc", limit=30)
-    daily_views = {item['date']: item['views'] for item in d_data}
-    return {"total_views": total_views, "daily_views": daily_views}
+    if not view_counter: return {"total_views": 0, "daily_views": {}}
+    return read_cache.cached(("stats",), READ_CACHE_TTL["stats"], view_counter.stats)
 
 def increment_views():
-    if not db: return
-    today = datetime.now().strftime("%Y-%m-%d")
-    curr_global = db.select("global_stats", key="total_views")
-    if curr_global:
-        db.update("global_stats", {"value": curr_global[0]['value'] + 1}, key="total_views")
-    else:
-        db.insert("global_stats", {"key": "total_views", "value": 1})
-    curr_daily = db.select("daily_stats", date=today)
-    if curr_daily:
-        db.update("daily_stats", {"views": curr_daily[0]['views'] + 1}, date=today)
+    if not view_counter: return
+    view_counter.increment()
+    read_cache.invalidate("stats")
+
+def get_read_cache_stats():
+    return read_cache.stats()
+
+COMMENTS_PAGE_SIZE = 20
+COMMENT_COLUMNS = "id,created_at,nickname,content"  # never send password hashes to the page
+
+def get_comments_page(page_id, cursor=None, page_size=COMMENTS_PAGE_SIZE):
+    # Keyset pagination on (created_at, id), newest first. `cursor` is the
+    # (created_at, id) of the last comment already shown.
+    empty = {"comments": [], "next_cursor": None, "total": 0}
+    if not db: return empty
+    filters = None
+    if cursor:
+        created_at, comment_id = cursor
+        filters = {"or": f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{comment_id}))'}
+    query = dict(select=COMMENT_COLUMNS, order="created_at.desc,id.desc",
+                 limit=page_size + 1, filters=filters, page_id=page_id)
+    if cursor:
+        rows, total = db.select("comments", **query), None
     else:
-        db.insert("daily_stats", {"date": today, "views": 1})
+        rows, total = db.select_with_count("comments", **query)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = (rows[-1]['created_at'], rows[-1]['id']) if has_more else None
+    return {"comments": rows, "next_cursor": next_cursor, "total": total}
 
 def get_comments(page_id):
-    if not db: return []
-    return db.select("comments", page_id=page_id, order="created_at.desc")
+    return get_comments_page(page_id)["comments"]
+
+COMMENT_HASH_ITERATIONS = 200_000
+
+def hash_comment_password(password, salt=None):
+    # SqliteClient's stand-in for the bcrypt trigger in schema_comments_delete.sql
+    # (the stdlib has no bcrypt): "pbkdf2_sha256$<iterations>$<salt>$<hex>".
+    salt = salt or secrets.token_hex(8)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"),
+                                 COMMENT_HASH_ITERATIONS).hex()
+    return f"pbkdf2_sha256${COMMENT_HASH_ITERATIONS}${salt}${digest}"
+
+def check_comment_password(password, stored):
+    if stored.startswith("pbkdf2_sha256$"):
+        _, iterations, salt, digest = stored.split("$")
+        candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"),
+                                        int(iterations)).hex()
+        return hmac.compare_digest(candidate, digest)
+    return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
 
 def add_comment(page_id, nickname, password, content):
     if not db: return False
     if not nickname or not password or not content: return False
+    # The password is hashed on the server by a BEFORE INSERT trigger (schema_comments_delete.sql)
     data = {"page_id": page_id, "nickname": nickname, "password": password, "content": content}
-    return db.insert("comments", data) is not None
+    return db.insert("comments", data, select=COMMENT_COLUMNS) is not None
 
 def delete_comment(comment_id, password):
     if not db: return False
-    target = db.select("comments", id=comment_id)
+    if not password: return False
+    # Password check and DELETE happen in one server-side statement (rpc/delete_comment)
+    deleted = db.rpc("delete_comment", {"p_id": comment_id, "p_password": password})
+    if deleted is None and "delete_comment" in db.missing_functions:
+        return _legacy_delete_comment(comment_id, password)
+    return deleted is True
+
+def _legacy_delete_comment(comment_id, password):
+    # Until schema_comments_delete.sql is applied: rows hold the plain password
+    target = db.select("comments", select="id,password", id=comment_id)
     if not target: return False
-    if target[0]['password'] == password:
+    if check_comment_password(password, target[0]['password']):
         return db.delete("comments", id=comment_id)
     return False
 
@@ -176,58 +1168,1206 @@ def delete_comment(comment_id, password):
 # 2. RSS FEED SERVICE
 # ==========================================
 
-def fetch_all_feeds(feed_urls):
-    all_news = []
-    for url in feed_urls:
+# Parallel fetch settings: a deadline per feed and one for the whole batch.
+FEED_FETCH_WORKERS = int(os.environ.get("FEED_FETCH_WORKERS", 8))
+FEED_TIMEOUT = float(os.environ.get("FEED_TIMEOUT", 10))
+FEED_BATCH_TIMEOUT = float(os.environ.get("FEED_BATCH_TIMEOUT", 30))
+FEED_MAX_ENTRIES = 5           # newest entries kept per feed; None keeps all (incremental mode)
+FEED_USER_AGENT = "Mozilla/5.0 (compatible; EricNewsroom/1.0; +https://github.com/rosl622/webai2)"
+
+# Conditional-GET cache: validators plus parsed entries per feed URL, persisted between runs.
+FEED_CACHE_PATH = os.environ.get(
+    "FEED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "feed_cache.json"),
+)
+
+def _write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+class FeedCache:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
         try:
-            feed = feedparser.parse(url)
-            source_title = feed.feed.get('title', 'Unknown Source')
-            for entry in feed.entries[:5]:
-                news_item = {
-                    'title': entry.get('title', 'No Title'),
-                    'link': entry.get('link', '#'),
-                    'published': entry.get('published', entry.get('updated', '')),
-                    'summary': entry.get('summary', ''),
-                    'source': source_title
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def validators(self, url):
+        with self.lock:
+            cached = self.entries.get(url)
+        if not cached:
+            return {}
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("modified"):
+            headers["If-Modified-Since"] = cached["modified"]
+        return headers
+
+    def hit(self, url):
+        with self.lock:
+            self.hits += 1
+            return [NewsItem.from_dict(item) for item in self.entries[url]["news"]]
+
+    def store(self, url, response, news):
+        with self.lock:
+            self.misses += 1
+            etag = response.headers.get("ETag")
+            modified = response.headers.get("Last-Modified")
+            if etag or modified:
+                self.entries[url] = {
+                    "etag": etag,
+                    "modified": modified,
+                    "fetched_at": datetime.now().isoformat(timespec="seconds"),
+                    "news": [item.to_dict() for item in news],
                 }
-                all_news.append(news_item)
-        except Exception as e:
-            print(f"Error parsing feed {url}: {e}")
-            continue
-    return all_news
+                self.dirty = True
+            elif self.entries.pop(url, None) is not None:
+                self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                _write_json_atomic(self.path, self.entries)
+                self.dirty = False
+            except OSError as e:
+                print(f"Feed cache save error: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "cached_feeds": len(self.entries)}
+
+feed_cache = FeedCache(FEED_CACHE_PATH)
+
+def get_feed_cache_stats():
+    return feed_cache.stats()
+
+def _parse_feed(url, timeout=FEED_TIMEOUT, use_cache=True, max_entries=FEED_MAX_ENTRIES):
+    with run_metrics.span("feed") as span:
+        span["url"] = url
+        news = _download_feed(url, timeout, use_cache, span)[:max_entries]
+        span["items"] = len(news)
+        return news
+
+def _entry_time(entry):
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not parsed:
+        return None
+    return datetime(*parsed[:6], tzinfo=timezone.utc).isoformat()
+
+def _download_feed(url, timeout, use_cache, span):
+    # feedparser.parse(url) has no timeout, so download with requests and parse the bytes.
+    headers = {"User-Agent": FEED_USER_AGENT}
+    if use_cache:
+        headers.update(feed_cache.validators(url))
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and use_cache:
+        span["not_modified"] = 1
+        return feed_cache.hit(url)
+    response.raise_for_status()
+    span["bytes"] = len(response.content)
+    # Parsing bytes loses what feedparser would read off the response itself: the
+    # Content-Type charset and the base URL for relative links. It looks headers
+    # up by lower-case name, so don't pass requests' case-insensitive dict as is.
+    response_headers = {k.lower(): v for k, v in response.headers.items()}
+    response_headers["content-location"] = response.url
+    feed = feedparser.parse(response.content, response_headers=response_headers)
+    source_title = feed.feed.get('title', 'Unknown Source')
+    news = []
+    # Every entry is parsed and cached; _parse_feed trims to max_entries
+    for entry in feed.entries:
+        news.append(NewsItem(
+            title=entry.get('title', 'No Title'),
+            link=entry.get('link', '#'),
+            summary=entry.get('summary', ''),
+            source=source_title,
+            published=entry.get('published', entry.get('updated', '')),
+            published_at=_entry_time(entry),
+            guid=entry.get('id') or '',
+            feed_url=url,
+        ))
+    if use_cache:
+        feed_cache.store(url, response, news)
+    return news
+
+def fetch_feed_map(feed_urls, max_workers=FEED_FETCH_WORKERS, feed_timeout=FEED_TIMEOUT,
+                   total_timeout=FEED_BATCH_TIMEOUT, use_cache=True, max_entries=FEED_MAX_ENTRIES):
+    # Each unique URL is fetched once; the map keeps the first-seen input order.
+    feed_urls = list(dict.fromkeys(feed_urls))
+    results = {url: [] for url in feed_urls}
+    if not feed_urls:
+        return results
+
+    if max_workers <= 1:
+        for url in feed_urls:
+            try:
+                results[url] = _parse_feed(url, timeout=feed_timeout, use_cache=use_cache, max_entries=max_entries)
+            except Exception as e:
+                print(f"Error parsing feed {url}: {e}")
+        if use_cache:
+            feed_cache.save()
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(feed_urls)))
+    futures = {pool.submit(_parse_feed, url, feed_timeout, use_cache, max_entries): url for url in feed_urls}
+    try:
+        for future in as_completed(futures, timeout=total_timeout):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                print(f"Error parsing feed {url}: {e}")
+    except FuturesTimeout:
+        for future, url in futures.items():
+            if not future.done():
+                print(f"Error parsing feed {url}: batch deadline of {total_timeout}s exceeded")
+    finally:
+        # Don't wait for feeds past the deadline; their requests timeout cleans them up.
+        pool.shutdown(wait=False, cancel_futures=True)
+        if use_cache:
+            feed_cache.save()
+    return results
+
+def fetch_all_feeds(feed_urls, **kwargs):
+    feed_urls = list(feed_urls)
+    feed_map = fetch_feed_map(feed_urls, **kwargs)
+    # Results follow the input order, not completion order
+    return [item for url in dict.fromkeys(feed_urls) for item in feed_map[url]]
+
+def fetch_category_feeds(category_feeds, **kwargs):
+    # Run-level plan: fetch the union of all category feeds once, then fan the
+    # parsed entries back out to every category that subscribes to each URL.
+    all_urls = [url for feeds in category_feeds.values() for url in feeds]
+    feed_map = fetch_feed_map(all_urls, **kwargs)
+    return {
+        category: [item for url in dict.fromkeys(feeds) for item in feed_map[url]]
+        for category, feeds in category_feeds.items()
+    }
 
 # ==========================================
-# 3. AI / GEMINI SERVICE
+# 3. NEWS PREPROCESSING
 # ==========================================
 
-def configure_gemini(api_key):
-    global _client
-    _client = genai.Client(api_key=api_key)
+def estimate_tokens(text):
+    # Rough Gemini token estimate: ~4 ASCII chars per token, ~1.5 Hangul/other chars per token.
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return int(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5) + 1
 
-_client = None
+_TITLE_TAG_RE = re.compile(r"^\s*(?:[\[\(【<][^\]\)】>]{1,12}[\]\)】>]\s*)+|(?:\s*[\[\(【<][^\]\)】>]{1,12}[\]\)】>])+\s*$")
+_TITLE_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,30}$")
+_TITLE_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
 
-def generate_news_summary(news_items, category="IT"):
-    if not news_items:
-        return '{"headline": "No news items to analyze.", "trends": "", "insight": ""}'
+def normalize_title(title):
+    # Drops [단독]/(종합) style tags and Google News " - 매체명" suffixes so copies
+    # of the same story from different outlets normalize to (nearly) the same text.
+    text = unicodedata.normalize("NFKC", title or "").lower()
+    text = _TITLE_SOURCE_SUFFIX_RE.sub("", text)
+    text = _TITLE_TAG_RE.sub("", text)
+    text = _TITLE_PUNCT_RE.sub(" ", text)
+    return " ".join(text.split())
+
+# Summaries at least this long are kept zlib-compressed until read (feeds that ship
+# full article HTML); shorter ones are stored as-is.
+SUMMARY_COMPRESS_MIN_CHARS = 512
+
+def _pack_summary(text):
+    if len(text) < SUMMARY_COMPRESS_MIN_CHARS:
+        return text
+    packed = zlib.compress(text.encode("utf-8"))
+    return packed if sys.getsizeof(packed) < sys.getsizeof(text) else text
+
+class NewsItem:
+    # One feed entry on its way from fetch to prompt. Slotted, with the source and feed
+    # URL interned (one string per outlet), a 64-bit content hash computed once and long
+    # raw summaries compressed until accessed. The normalized title is derived on demand
+    # (it is read once, by clustering): storing it cost more per item than __slots__ saves.
+    # item['title'] / item.get('summary') still work for code written against dicts.
+    FIELDS = ("title", "link", "summary", "source", "published", "published_at",
+              "guid", "feed_url", "first_seen", "sources")
+    __slots__ = ("title", "link", "source", "published", "published_at", "guid", "feed_url",
+                 "first_seen", "sources", "content_hash", "_summary")
+
+    def __init__(self, title, link="#", summary="", source="Unknown Source", published="",
+                 published_at=None, guid="", feed_url=None, first_seen=None, sources=()):
+        self.title = str(title or "No Title")
+        self.link = str(link or "#")
+        self.source = sys.intern(str(source or "Unknown Source"))
+        self.published = str(published or "")
+        self.published_at = published_at
+        self.guid = self.link if guid == link else str(guid or "")
+        self.feed_url = sys.intern(str(feed_url)) if feed_url else None
+        self.first_seen = first_seen
+        self.sources = tuple(sys.intern(str(s)) for s in sources)
+        summary = str(summary or "")
+        # 64 bits keep the int small; it only keys per-process and per-day caches
+        self.content_hash = int.from_bytes(hashlib.blake2b(
+            f"{normalize_title(self.title)}\n{' '.join(summary.split())}".encode("utf-8"), digest_size=8
+        ).digest(), "big")
+        self._summary = _pack_summary(summary)
+
+    @property
+    def normalized_title(self):
+        return normalize_title(self.title)
+
+    @property
+    def summary(self):
+        raw = self._summary
+        return zlib.decompress(raw).decode("utf-8") if isinstance(raw, bytes) else raw
+
+    @classmethod
+    def from_dict(cls, data):
+        # Accepts feed-cache entries, news_items rows and legacy item dicts (extra keys ignored)
+        return cls(**{key: data[key] for key in cls.FIELDS if data.get(key) is not None})
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.FIELDS}
+        data["sources"] = list(self.sources)
+        return data
+
+    def replace(self, **changes):
+        return NewsItem(**{**{key: getattr(self, key) for key in self.FIELDS}, **changes})
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def __repr__(self):
+        return f"NewsItem(title={self.title!r}, source={self.source!r}, link={self.link!r})"
+
+def as_news_item(item):
+    return item if isinstance(item, NewsItem) else NewsItem.from_dict(item)
+
+# Feed summaries arrive as HTML (Google News wraps the title in <a> plus a <font>
+# outlet tag; etnews/boannews add <img>, <br>, bylines and copyright lines). Before
+# they reach a prompt they are reduced to plain text and capped.
+SUMMARY_MAX_CHARS = 500
+SUMMARY_TEXT_CACHE_SIZE = int(os.environ.get("SUMMARY_TEXT_CACHE_SIZE", 20_000))
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+|\b[\w.-]+\.(?:com|net|org|co\.kr|or\.kr|go\.kr|kr)(?:/\S*)?",
+                     re.IGNORECASE)
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_BOILERPLATE_RES = [
+    re.compile(r"<?\s*(?:저작권자\s*)?[ⓒ©]\s*[^.。<>]{0,40}?(?:무단\s*전재.{0,12}?금지\s*>?|>|$)"),
+    re.compile(r"무단\s*전재\s*(?:및|&|·|,)?\s*(?:재배포|배포)\s*금지"),
+    re.compile(r"copyright\b.{0,80}?(?:reserved\.?|$)", re.IGNORECASE),
+    re.compile(r"\[[^\[\]]{0,30}(?:기자|특파원)\]"),                  # [아이뉴스24 홍길동 기자]
+    re.compile(r"(?:\([^()]{0,20}=[^()]{0,20}\)\s*)?[가-힣]{2,4}\s*(?:기자|특파원)\s*="),  # (서울=뉴스1) 홍길동 기자 =
+    re.compile(r"[가-힣]{2,4}\s*(?:기자|특파원)\s*$"),
+    re.compile(r"\[?(?:기사\s*)?(?:원문\s*)?(?:더\s*보기|전체\s*보기|계속\s*읽기|자세히\s*보기)\]?"
+               r"|\b(?:read more|continue reading)\b|\[(?:…|\.\.\.)\]", re.IGNORECASE),
+]
+_TITLE_ECHO_MAX_CHARS = 30     # "<title> <outlet>" summaries only repeat the title
+
+class _SummaryTextParser(HTMLParser):
+    # Streaming tag stripper: keeps text nodes (entities already decoded), turns block
+    # tags into spaces and drops whatever sits inside script/style-like elements.
+    SKIP_TAGS = {"script", "style", "noscript", "iframe", "figcaption", "head", "title"}
+    BREAK_TAGS = {"br", "p", "div", "li", "ul", "ol", "tr", "td", "th", "table", "blockquote",
+                  "h1", "h2", "h3", "h4", "h5", "h6", "hr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in self.BREAK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in self.BREAK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+def html_to_text(markup):
+    if "<" not in markup and "&" not in markup:
+        return markup
+    parser = _SummaryTextParser()
+    parser.feed(markup)
+    parser.close()
+    return "".join(parser.parts)
+
+def clean_summary(summary, title="", max_chars=SUMMARY_MAX_CHARS):
+    # Plain text for the prompt: tags and entities, URLs, e-mail addresses, bylines and
+    # copyright boilerplate removed, whitespace collapsed, capped at a word boundary.
+    # A summary that only repeats the title (plus the outlet name) becomes "".
+    text = html_to_text(summary or "")
+    text = _EMAIL_RE.sub(" ", text)
+    text = _URL_RE.sub(" ", text)
+    text = " ".join(text.split())
+    for pattern in _BOILERPLATE_RES:
+        text = pattern.sub(" ", text)
+    text = " ".join(text.split())
+    normalized_title = normalize_title(title)
+    if normalized_title:
+        normalized = normalize_title(text)
+        extra = len(normalized) - len(normalized_title)
+        if normalized.startswith(normalized_title) and extra <= min(_TITLE_ECHO_MAX_CHARS, len(normalized_title)):
+            return ""
+    if len(text) > max_chars:
+        cut = text[:max_chars]
+        text = (cut.rsplit(" ", 1)[0] if " " in cut else cut).rstrip(" ,.;:·") + "…"
+    return text
+
+class SummaryTextCache:
+    # Cleaned summaries keyed by NewsItem.content_hash, so a story is cleaned once per
+    # process rather than once per category, model budget and dedup pass. LRU-bounded.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, item):
+        with self.lock:
+            text = self.entries.get(item.content_hash)
+            if text is not None:
+                self.entries.move_to_end(item.content_hash)
+                self.hits += 1
+                return text
+            self.misses += 1
+        text = clean_summary(item.summary, item.title)
+        with self.lock:
+            self.entries[item.content_hash] = text
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return text
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+summary_text_cache = SummaryTextCache(SUMMARY_TEXT_CACHE_SIZE)
+
+def get_summary_text_cache_stats():
+    return summary_text_cache.stats()
+
+def prompt_summary(item):
+    return summary_text_cache.get(as_news_item(item))
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4              # 4 bands x 16 bits: any pair within 3 bits shares a band
+DEDUP_MAX_DISTANCE = 3
+DEDUP_SHINGLE_SIZE = 3
+
+def simhash(text, shingle_size=DEDUP_SHINGLE_SIZE):
+    text = text.replace(" ", "")
+    if len(text) <= shingle_size:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            if h >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value
+
+def _news_line(item, summary=None):
+    line = f"- {item.title} : {prompt_summary(item) if summary is None else summary}"
+    sources = item.sources
+    if len(sources) > 1:
+        line += f" (sources: {', '.join(sources)})"
+    return line + "\n"
+
+def cluster_news_items(news_items, category="IT", max_distance=DEDUP_MAX_DISTANCE):
+    # Groups near-duplicate stories by SimHash of the normalized title. Band buckets
+    # (LSH) keep this linear: each item is only compared to clusters sharing a band.
+    band_bits = SIMHASH_BITS // SIMHASH_BANDS
+    band_mask = (1 << band_bits) - 1
+    buckets = {}
+    clusters = []  # [simhash, [items]]
+    news_items = [as_news_item(item) for item in news_items]
+    for item in news_items:
+        key = item.normalized_title
+        h = simhash(key) if key else None
+        bands = [] if h is None else [(b, h >> (b * band_bits) & band_mask) for b in range(SIMHASH_BANDS)]
+        match = None
+        for band in bands:
+            for idx in buckets.get(band, ()):
+                if bin(clusters[idx][0] ^ h).count("1") <= max_distance:
+                    match = idx
+                    break
+            if match is not None:
+                break
+        if match is None:
+            clusters.append([h, [item]])
+            for band in bands:
+                buckets.setdefault(band, []).append(len(clusters) - 1)
+        else:
+            clusters[match][1].append(item)
+
+    merged = []
+    for _, members in clusters:
+        representative = max(members, key=lambda it: len(prompt_summary(it)))
+        sources = []
+        for member in members:
+            for source in member.sources or (member.source,):
+                if source not in sources:
+                    sources.append(source)
+        merged.append(representative.replace(sources=sources))
+
+    if len(merged) < len(news_items):
+        saved_tokens = (sum(estimate_tokens(_news_line(item)) for item in news_items)
+                        - sum(estimate_tokens(_news_line(item)) for item in merged))
+        log.info(f"[{category}] dedup: {len(news_items)} -> {len(merged)} items "
+                 f"({len(news_items) - len(merged)} duplicates, ~{saved_tokens} tokens saved)")
+    return merged
+
+# Focus keywords per category: build_prompt names them to Gemini, and the relevance
+# prefilter below scores items against them (weight 2) plus the related terms (weight 1)
+# so off-topic items are dropped before we pay tokens to send them. IT has no list:
+# everything in its feeds is on topic.
+CATEGORY_KEYWORDS = {
+    "MVNO": ("MVNO", "알뜰폰", "통신사", "전파사용료", "망 도매대가"),
+    "KSTARTUP": ("스타트업", "창업", "투자유치", "VC", "액셀러레이터", "정부지원", "창업정책",
+                 "K-startup", "유니콘", "시리즈A/B", "팁스", "중기부"),
+    "VIBECODING": ("Antigravity", "Claude Code", "ChatGPT Codex", "Cursor AI", "Windsurf",
+                   "GitHub Copilot", "Gemini Code Assist", "Amazon Q Developer",
+                   "AI agent coding", "vibe coding", "바이브코딩", "agentic IDE", "LLM 코딩",
+                   "AI pair programming", "코딩 AI", "코딩 에이전트"),
+}
+CATEGORY_RELATED_TERMS = {
+    "MVNO": ("도매대가", "도매제공", "이통사", "이동통신", "통신비", "요금제", "번호이동",
+             "유심", "eSIM", "5G", "LTE", "SK텔레콤", "KT", "LG유플러스", "과기정통부", "방통위"),
+    "KSTARTUP": ("투자 유치", "시리즈A", "시리즈B", "시리즈C", "프리A", "시드 투자", "엑셀러레이터",
+                 "벤처", "창업진흥원", "중소벤처기업부", "모태펀드", "TIPS", "IPO", "상장", "인수합병",
+                 "M&A", "데모데이", "예비창업", "초기창업"),
+    "VIBECODING": ("Claude", "Codex", "Cursor", "Copilot", "Devin", "Replit", "Lovable", "Bolt",
+                   "코딩 어시스턴트", "AI 코딩", "코드 생성", "에이전트", "agentic", "LLM",
+                   "바이브 코딩", "vibecoding", "MCP", "IDE"),
+}
+KEYWORD_MIN_SCORE = int(os.environ.get("KEYWORD_MIN_SCORE", 1))
+KEYWORD_FILTER_MODE = os.environ.get("KEYWORD_FILTER_MODE", "drop")   # drop | demote
+KEYWORD_FOCUS_WEIGHT = 2
+
+def _keyword_text(text):
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+class KeywordMatcher:
+    # Aho-Corasick automaton: one pass over the text finds every keyword occurrence,
+    # however many keywords there are. Text and keywords are NFKC-normalized and
+    # casefolded; a keyword with spaces also matches its spaceless form (망 도매대가 /
+    # 망도매대가). Hangul needs no word boundary since particles attach directly
+    # (알뜰폰이, 알뜰폰을), but a Latin/digit edge must not touch another one ("VC" in "DVC").
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for index, keyword in enumerate(self.keywords):
+            variant = _keyword_text(keyword)
+            for form in dict.fromkeys((variant, variant.replace(" ", ""))):
+                if form:
+                    self._add(form, index)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def _add(self, form, index):
+        state = 0
+        for ch in form:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[state][ch] = nxt
+            state = nxt
+        self.out[state].append((index, len(form), _is_word_char(form[0]), _is_word_char(form[-1])))
+
+    def find(self, text):
+        # Indexes (into self.keywords) of every keyword found in the text
+        text = _keyword_text(text)
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index, length, check_start, check_end in out[state]:
+                start = i - length + 1
+                if check_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if check_end and i + 1 < len(text) and _is_word_char(text[i + 1]):
+                    continue
+                found.add(index)
+        return found
+
+_keyword_matchers = {}
+
+def keyword_matcher(category):
+    # (matcher, weights) for the category, built once; None if it declares no keywords
+    if category not in _keyword_matchers:
+        focus = CATEGORY_KEYWORDS.get(category, ())
+        related = CATEGORY_RELATED_TERMS.get(category, ())
+        weights = {}
+        for keyword in focus:
+            weights[keyword] = KEYWORD_FOCUS_WEIGHT
+        for term in related:
+            weights.setdefault(term, 1)
+        _keyword_matchers[category] = (KeywordMatcher(weights), list(weights.values())) if weights else None
+    return _keyword_matchers[category]
+
+def keyword_score(item, category):
+    entry = keyword_matcher(category)
+    if entry is None:
+        return None
+    matcher, weights = entry
+    item = as_news_item(item)
+    return sum(weights[i] for i in matcher.find(f"{item.title}\n{prompt_summary(item)}"))
+
+def filter_relevant_items(news_items, category, min_score=None, mode=None):
+    # Ranks items by keyword score (stable, so feed order breaks ties). Items under
+    # min_score are dropped, or with mode="demote" kept at the end where the token
+    # budget cuts them first. If nothing reaches min_score everything is kept: an
+    # off-topic briefing beats an empty one. Returns (items, number below min_score).
+    min_score = KEYWORD_MIN_SCORE if min_score is None else min_score
+    mode = mode or KEYWORD_FILTER_MODE
+    news_items = [as_news_item(item) for item in news_items]
+    if keyword_matcher(category) is None or not news_items:
+        return news_items, 0
+    scored = [(keyword_score(item, category), item) for item in news_items]
+    relevant = [item for score, item in sorted(scored, key=lambda pair: -pair[0]) if score >= min_score]
+    below = [item for score, item in scored if score < min_score]
+    if not relevant:
+        log.warning(f"[{category}] no item reaches keyword score {min_score}; keeping all {len(below)}")
+        return news_items, len(below)
+    if below:
+        log.info(f"[{category}] keyword prefilter: {len(relevant)} relevant, {len(below)} "
+                 f"{'dropped' if mode == 'drop' else 'demoted'} (min score {min_score})")
+    return (relevant if mode == "drop" else relevant + below), len(below)
+
+# When a category has more items than a prompt should carry (incremental runs pass
+# every new entry), keep the K most central ones, with maximal marginal relevance
+# so near-topics don't crowd out the rest of the day's news.
+NEWS_SELECT_TOP_K = int(os.environ.get("NEWS_SELECT_TOP_K", 40))
+MMR_LAMBDA = float(os.environ.get("MMR_LAMBDA", 0.7))   # 1.0 = centrality only
+_TFIDF_TOKEN_RE = re.compile(r"[가-힣]+|[0-9a-z]+")
+
+def _tfidf_tokens(text):
+    # Latin words/numbers as is; Hangul runs as character bigrams, which handles
+    # particles and compounds without a morphological analyzer (알뜰폰이 -> 알뜰, 뜰폰, 폰이).
+    tokens = []
+    for run in _TFIDF_TOKEN_RE.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if "가" <= run[0] <= "힣":
+            tokens.extend([run[i:i + 2] for i in range(len(run) - 1)] if len(run) > 1 else [run])
+        elif len(run) > 1:
+            tokens.append(run)
+    return tokens
+
+def tfidf_matrix(texts):
+    # L2-normalized sublinear TF-IDF rows in CSR form: (data, indices, indptr, row_of_entry)
+    vocab = {}
+    indices, indptr = [], [0]
+    for text in texts:
+        indices.extend(vocab.setdefault(token, len(vocab)) for token in _tfidf_tokens(text))
+        indptr.append(len(indices))
+    n = len(texts)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    # Collapse repeated (row, term) pairs into counts
+    keys, counts = np.unique(rows.astype(np.int64) * max(len(vocab), 1) + np.asarray(indices, dtype=np.int64),
+                             return_counts=True)
+    rows, indices = keys // max(len(vocab), 1), keys % max(len(vocab), 1)
+    df = np.bincount(indices, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    data = (1 + np.log(counts)) * idf[indices]
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=n))
+    data = data / np.where(norms > 0, norms, 1)[rows]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+    return data, indices, indptr, rows
+
+def _row_dot(matrix, vector, n):
+    data, indices, _, rows = matrix
+    return np.bincount(rows, weights=data * vector[indices], minlength=n)
+
+def select_news_items(news_items, k=None, diversity=None, preferred=None):
+    # TF-IDF over title (counted twice) + cleaned summary. Centrality is an item's mean
+    # cosine similarity to the others; MMR then picks, K times, the item maximizing
+    # diversity * centrality - (1 - diversity) * (max similarity to those already picked).
+    # The first `preferred` items (keyword-relevant ones in demote mode) are exhausted
+    # before any other is picked. Returns items in pick order; lists of <= K are unchanged.
+    k = NEWS_SELECT_TOP_K if k is None else k
+    diversity = MMR_LAMBDA if diversity is None else diversity
+    news_items = [as_news_item(item) for item in news_items]
+    n = len(news_items)
+    if n <= k:
+        return news_items
+    matrix = tfidf_matrix([f"{item.title}\n{item.title}\n{prompt_summary(item)}" for item in news_items])
+    data, indices, indptr, _ = matrix
+    centroid = np.bincount(indices, weights=data, minlength=int(indices.max(initial=-1)) + 1)
+    centrality = (_row_dot(matrix, centroid, n) - 1) / max(n - 1, 1)
+    preferred = n if preferred is None else max(0, min(preferred, n))
+    tier = np.arange(n) >= preferred if preferred else np.zeros(n, dtype=bool)
+    max_sim = np.zeros(n)
+    picked = np.zeros(n, dtype=bool)
+    order = []
+    for _ in range(k):
+        score = diversity * centrality - (1 - diversity) * max_sim
+        score[picked] = -np.inf
+        if (~picked & ~tier).any():
+            score[tier] = -np.inf
+        best = int(np.argmax(score))
+        order.append(best)
+        picked[best] = True
+        row = np.zeros(len(centroid))
+        row[indices[indptr[best]:indptr[best + 1]]] = data[indptr[best]:indptr[best + 1]]
+        max_sim = np.maximum(max_sim, _row_dot(matrix, row, n))
+    return [news_items[i] for i in order]
+
+# ==========================================
+# 4. AI / GEMINI SERVICE
+# ==========================================
+
+# Shared limiter for every Gemini call in the process, sized to the API quota so
+# concurrent category pipelines only slow down when the quota actually requires it.
+GEMINI_RPM = int(os.environ.get("GEMINI_RPM", 10))
+GEMINI_TPM = int(os.environ.get("GEMINI_TPM", 250_000))
+
+class TokenBucket:
+    def __init__(self, capacity, per_second):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def wait_time(self, amount):
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.per_second
+
+class RateLimiter:
+    def __init__(self, rpm, tpm):
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.calls = 0
+        self.waited = 0.0
+
+    def acquire(self, tokens=0):
+        # Blocks until one request and `tokens` prompt tokens are available; returns seconds waited.
+        tokens = min(tokens, self.tokens.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= tokens
+                    self.calls += 1
+                    self.waited += waited
+                    return waited
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self):
+        with self.lock:
+            return {"calls": self.calls, "waited_seconds": self.waited}
+
+gemini_limiter = RateLimiter(GEMINI_RPM, GEMINI_TPM)
+
+# Retry policy: errors are classified by type/status code, retries use the server's
+# RetryInfo hint when present and full-jitter exponential backoff otherwise.
+GEMINI_MAX_ATTEMPTS = int(os.environ.get("GEMINI_MAX_ATTEMPTS", 3))
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0          # longer server hints mean "move to the next model"
+BREAKER_FAILURE_THRESHOLD = 3   # consecutive failures before a model is skipped
+BREAKER_COOLDOWN = 30 * 60      # long enough to cover the rest of a run
 
-    news_text = "".join([f"- {item['title']} : {item['summary']}\n" for item in news_items])
+_RETRY_DELAY_RE = re.compile(r"^\s*([\d.]+)s\s*$")
 
+def _retry_after_hint(error):
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in (details.get("error") or {}).get("details") or []:
+            if isinstance(detail, dict) and detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+                match = _RETRY_DELAY_RE.match(str(detail.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+    response = getattr(error, "response", None)
+    header = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return float(header) if header else None
+    except ValueError:
+        return None
+
+def classify_gemini_error(error):
+    # Returns (kind, retry_after); kind is "rate_limit", "unavailable", "model_error"
+    # (model missing/not permitted: skip it for the run) or "fatal" (don't retry).
+    code = getattr(error, "code", None)
+    if isinstance(error, genai_errors.APIError) and isinstance(code, int):
+        if code == 429:
+            return "rate_limit", _retry_after_hint(error)
+        if code in (500, 502, 503, 504):
+            return "unavailable", _retry_after_hint(error)
+        if code in (403, 404):
+            return "model_error", None
+        return "fatal", None
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError,
+                          httpx.ConnectError, httpx.TimeoutException)):
+        return "unavailable", None
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500:
+        return "unavailable", _retry_after_hint(error)
+    return "fatal", None
+
+def retry_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        return retry_after if retry_after <= RETRY_MAX_DELAY else None
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt + 1)))
+
+class ModelHealth:
+    # Per-model circuit breaker plus latency/error counters, shared by all categories.
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+        self.successes = 0
+        self.errors = {}
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.sleep_total = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def allow(self):
+        with self.lock:
+            return time.monotonic() >= self.open_until
+
+    def reopens_at(self):
+        with self.lock:
+            return self.open_until
+
+    def reset_breaker(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+
+    def _observe(self, latency):
+        self.calls += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def record_success(self, latency, input_tokens=None, output_tokens=None):
+        with self.lock:
+            self._observe(latency)
+            self.successes += 1
+            self.input_tokens += input_tokens or 0
+            self.output_tokens += output_tokens or 0
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+
+    def record_failure(self, kind, latency):
+        with self.lock:
+            self._observe(latency)
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+            if kind == "rate_limit":
+                # 429s come from the quota shared by every model and category; the
+                # RateLimiter and retry_delay handle them, the model itself is fine.
+                return
+            self.consecutive_failures += 1
+            if kind == "model_error" or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+                self.open_until = time.monotonic() + BREAKER_COOLDOWN
+
+    def record_sleep(self, seconds):
+        with self.lock:
+            self.sleep_total += seconds
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "successes": self.successes,
+                "errors": dict(self.errors),
+                "avg_latency": self.latency_total / self.calls if self.calls else 0.0,
+                "max_latency": self.latency_max,
+                "sleep_seconds": self.sleep_total,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "circuit_open": time.monotonic() < self.open_until,
+            }
+
+_model_health = {}
+_model_health_lock = threading.Lock()
+
+def model_health(model_name):
+    with _model_health_lock:
+        if model_name not in _model_health:
+            _model_health[model_name] = ModelHealth(model_name)
+        return _model_health[model_name]
+
+def reset_model_breakers():
+    # Closes every circuit; counters are kept for the stats page
+    with _model_health_lock:
+        models = list(_model_health.values())
+    for health in models:
+        health.reset_breaker()
+
+def get_model_stats():
+    with _model_health_lock:
+        models = list(_model_health.values())
+    return {health.name: health.stats() for health in models}
+
+# Content-addressed cache of Gemini briefings. Bump PROMPT_VERSION whenever
+# build_prompt/build_news_text change so old answers are not reused.
+PROMPT_VERSION = 2
+SUMMARY_CACHE_PATH = os.environ.get(
+    "SUMMARY_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "summary_cache.json"),
+)
+SUMMARY_CACHE_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", 24 * 3600))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", 200))
+
+class SummaryCache:
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        # Entries are kept in least-recently-used order
+        self.entries = OrderedDict(sorted(stored.items(), key=lambda kv: kv[1].get("used_at", 0)))
+
+    @staticmethod
+    def make_key(news_items, category, model_name):
+        hashes = sorted(as_news_item(item).content_hash for item in news_items)
+        payload = json.dumps([category, PROMPT_VERSION, model_name, hashes], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, keys):
+        # Returns the first fresh entry among `keys` (e.g. one key per fallback model).
+        with self.lock:
+            now = time.time()
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if now - entry["created_at"] > self.ttl:
+                    del self.entries[key]
+                    continue
+                entry["used_at"] = now
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry["text"]
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        with self.lock:
+            now = time.time()
+            self.entries[key] = {"text": text, "created_at": now, "used_at": now}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            try:
+                _write_json_atomic(self.path, self.entries)
+            except OSError as e:
+                print(f"Summary cache save error: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+summary_cache = SummaryCache(SUMMARY_CACHE_PATH, SUMMARY_CACHE_TTL, SUMMARY_CACHE_MAX_ENTRIES)
+
+def get_summary_cache_stats():
+    return summary_cache.stats()
+
+# LLM backends: generate_news_summary only talks to the object set by configure_gemini,
+# so the pipeline can run offline (LLM_BACKEND=fake) for tests and load tests.
+class LLMResponse:
+    def __init__(self, text, input_tokens=None, output_tokens=None):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, api_key):
+        self.client = genai.Client(api_key=api_key)
+
+    def generate(self, model_name, prompt):
+        response = self.client.models.generate_content(
+            model=model_name,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json"
+            ),
+        )
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text,
+            getattr(usage, "prompt_token_count", None),
+            getattr(usage, "candidates_token_count", None),
+        )
+
+_NEWS_TITLE_RE = re.compile(r"^\s*- (.+?) : ", re.MULTILINE)
+
+class FakeLLMBackend:
+    # Deterministic offline stand-in: answers with a schema-valid briefing built from the
+    # prompt's news titles after a simulated latency, and raises the same genai errors
+    # as the real API (429 with RetryInfo, 503) either at random or on demand.
+    name = "fake"
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, rate_limit_rate=0.0, unavailable_rate=0.0,
+                 retry_after=None, output_tokens=600, failing_models=(), seed=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.unavailable_rate = unavailable_rate
+        self.retry_after = retry_after
+        self.output_tokens = output_tokens
+        self.failing_models = set(failing_models)  # answered with 404 (model not found)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.scripted = []
+        self.calls = 0
+        self.errors = {}
+
+    def fail_next(self, code, count=1):
+        # Queue `count` errors with HTTP status `code` (429, 503, 404, ...) for the next calls.
+        with self.lock:
+            self.scripted.extend([code] * count)
+
+    def _error(self, code):
+        status = {429: "RESOURCE_EXHAUSTED", 404: "NOT_FOUND", 403: "PERMISSION_DENIED"}.get(code, "UNAVAILABLE")
+        body = {"error": {"code": code, "message": "injected by FakeLLMBackend", "status": status}}
+        if code == 429 and self.retry_after is not None:
+            body["error"]["details"] = [{
+                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                "retryDelay": f"{self.retry_after}s",
+            }]
+        error_class = genai_errors.ServerError if code >= 500 else genai_errors.ClientError
+        return error_class(code, body)
+
+    def _pick_error(self, model_name):
+        with self.lock:
+            self.calls += 1
+            if model_name in self.failing_models:
+                code = 404
+            elif self.scripted:
+                code = self.scripted.pop(0)
+            else:
+                roll = self.rng.random()
+                code = (429 if roll < self.rate_limit_rate
+                        else 503 if roll < self.rate_limit_rate + self.unavailable_rate
+                        else None)
+            delay = max(0.0, self.latency + self.rng.uniform(-self.latency_jitter, self.latency_jitter))
+            if code is not None:
+                self.errors[code] = self.errors.get(code, 0) + 1
+            return code, delay
+
+    def generate(self, model_name, prompt):
+        code, delay = self._pick_error(model_name)
+        time.sleep(delay)
+        if code is not None:
+            raise self._error(code)
+
+        titles = _NEWS_TITLE_RE.findall(prompt) or ["뉴스"]
+        headline = "\n\n".join(f"**[{t}]** {t} 관련 소식입니다." for t in titles[:2])
+        trends = "\n\n".join(f"**[동향 {i + 1}]** {t}" for i, t in enumerate(titles[2:7])) or headline
+        insight = f"{model_name} 모의 응답입니다. 분석한 뉴스 {len(titles)}건을 바탕으로 한 전망입니다."
+        while estimate_tokens(insight) < self.output_tokens:
+            insight += " 시장의 변화를 계속 지켜볼 필요가 있습니다."
+        text = json.dumps({"headline": headline, "trends": trends, "insight": insight}, ensure_ascii=False)
+        return LLMResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    def stats(self):
+        with self.lock:
+            return {"calls": self.calls, "errors": dict(self.errors)}
+
+def llm_backend_from_env(api_key=None):
+    if os.environ.get("LLM_BACKEND", "gemini").lower() == "fake":
+        return FakeLLMBackend(
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", 0.5)),
+            latency_jitter=float(os.environ.get("FAKE_LLM_LATENCY_JITTER", 0.2)),
+            rate_limit_rate=float(os.environ.get("FAKE_LLM_429_RATE", 0.0)),
+            unavailable_rate=float(os.environ.get("FAKE_LLM_503_RATE", 0.0)),
+            retry_after=float(os.environ["FAKE_LLM_RETRY_AFTER"]) if os.environ.get("FAKE_LLM_RETRY_AFTER") else None,
+            output_tokens=int(os.environ.get("FAKE_LLM_OUTPUT_TOKENS", 600)),
+            seed=int(os.environ["FAKE_LLM_SEED"]) if os.environ.get("FAKE_LLM_SEED") else None,
+        )
+    return GeminiBackend(api_key)
+
+def configure_gemini(api_key=None, backend=None):
+    global _llm_backend
+    _llm_backend = backend if backend is not None else llm_backend_from_env(api_key)
+    # Breakers are module-global; a new run (auto_fetch, or the admin button in the
+    # long-lived Streamlit process) must not inherit a 30-minute outage from an old one.
+    reset_model_breakers()
+    return _llm_backend
+
+def get_llm_backend():
+    return _llm_backend
+
+_llm_backend = None
+
+# Token budget for the [뉴스 데이터] block per model: kept well under each model's
+# input window (and lower for the lighter models) to bound latency and cost.
+MODEL_TOKEN_LIMITS = {
+    # model: (input token limit, output token limit)
+    "gemini-2.5-flash": (1_048_576, 65_536),
+    "gemini-2.0-flash-lite": (1_048_576, 8_192),
+    "gemini-2.0-flash": (1_048_576, 8_192),
+    "gemini-1.5-pro": (2_097_152, 8_192),
+}
+MODEL_NEWS_BUDGETS = {
+    "gemini-2.5-flash": 32_000,
+    "gemini-2.0-flash-lite": 16_000,
+    "gemini-2.0-flash": 24_000,
+    "gemini-1.5-pro": 32_000,
+}
+DEFAULT_NEWS_BUDGET = 16_000
+SUMMARY_TOKEN_CAP = 160        # per-item cap before budgeting
+MIN_SUMMARY_TOKENS = 24        # below this a truncated summary is dropped, title kept
+PROMPT_TEMPLATE_TOKENS = 900   # rough size of the instructions around news_text
+
+def news_token_budget(model_name):
+    budget = MODEL_NEWS_BUDGETS.get(model_name, DEFAULT_NEWS_BUDGET)
+    input_limit, _ = MODEL_TOKEN_LIMITS.get(model_name, (budget + PROMPT_TEMPLATE_TOKENS, 0))
+    return max(0, min(budget, input_limit - PROMPT_TEMPLATE_TOKENS))
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。…])\s+")
+
+def truncate_summary(summary, max_tokens):
+    # Keeps whole sentences while they fit; only cuts mid-sentence if the first one is too long.
+    if estimate_tokens(summary) <= max_tokens:
+        return summary
+    kept = ""
+    for sentence in _SENTENCE_END_RE.split(summary):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        kept = candidate
+    if kept:
+        return kept
+    cut = summary
+    while cut and estimate_tokens(cut + "…") > max_tokens:
+        cut = cut[:max(1, int(len(cut) * 0.8))] if len(cut) > 1 else ""
+    return cut + "…" if cut else ""
+
+def build_news_text(news_items, budget):
+    # Splits the budget fairly between sources (max-min fair share), so one chatty
+    # feed can't crowd out the others, then fills each source's share in input order.
+    news_items = [as_news_item(item) for item in news_items]
+    lines = []
+    for item in news_items:
+        lines.append(_news_line(item, truncate_summary(prompt_summary(item), SUMMARY_TOKEN_CAP)))
+    by_source = {}
+    for idx, item in enumerate(news_items):
+        source = (item.sources or (item.source,))[0]
+        by_source.setdefault(source, []).append(idx)
+
+    demand = {source: sum(estimate_tokens(lines[i]) for i in idxs) for source, idxs in by_source.items()}
+    share = {}
+    remaining = budget
+    pending = sorted(demand, key=demand.get)
+    while pending:
+        fair = remaining / len(pending)
+        source = pending.pop(0)
+        share[source] = min(demand[source], fair)
+        remaining -= share[source]
+
+    chosen = {}
+    for source, idxs in by_source.items():
+        left = share[source]
+        for i in idxs:
+            cost = estimate_tokens(lines[i])
+            if cost <= left:
+                chosen[i] = lines[i]
+                left -= cost
+                continue
+            item = news_items[i]
+            title_only = _news_line(item, '')
+            title_cost = estimate_tokens(title_only)
+            if title_cost > left:
+                break
+            summary = truncate_summary(prompt_summary(item), int(left - title_cost))
+            if estimate_tokens(summary) >= MIN_SUMMARY_TOKENS:
+                chosen[i] = _news_line(item, summary)
+            else:
+                chosen[i] = title_only
+            left -= estimate_tokens(chosen[i])
+            break
+    return "".join(chosen[i] for i in sorted(chosen)), len(chosen)
+
+def build_prompt(news_text, category="IT"):
     role_description = "IT 전문 뉴스 큐레이터"
     focus_instruction = "오늘 가장 중요한 IT 트렌드를 분석해서"
 
+    keywords = ", ".join(CATEGORY_KEYWORDS.get(category, ()))
     if category == "MVNO":
         role_description = "통신 및 알뜰폰(MVNO) 산업 전문가"
-        focus_instruction = "다음 키워드(MVNO, 알뜰폰, 통신사, 전파사용료, 망 도매대가)를 중심으로 관련 소식을 분석해서"
+        focus_instruction = f"다음 키워드({keywords})를 중심으로 관련 소식을 분석해서"
     elif category == "KSTARTUP":
         role_description = "한국 창업 생태계 및 스타트업 전문 애널리스트"
-        focus_instruction = "다음 키워드(스타트업, 창업, 투자유치, VC, 액셀러레이터, 정부지원, 창업정책, K-startup, 유니콘, 시리즈A/B, 팁스, 중기부)를 중심으로 오늘의 주요 창업 생태계 동향을 분석해서"
+        focus_instruction = f"다음 키워드({keywords})를 중심으로 오늘의 주요 창업 생태계 동향을 분석해서"
     elif category == "VIBECODING":
         role_description = "AI 에이전트 코딩 도구 및 바이브코딩 비즈니스 전문 큐레이터"
         focus_instruction = (
-            "다음 키워드(Antigravity, Claude Code, ChatGPT Codex, Cursor AI, Windsurf, "
-            "GitHub Copilot, Gemini Code Assist, Amazon Q Developer, "
-            "AI agent coding, vibe coding, 바이브코딩, agentic IDE, LLM 코딩, "
-            "AI pair programming, 코딩 AI, 코딩 에이전트)를 중심으로 "
+            f"다음 키워드({keywords})를 중심으로 "
             "AI 코딩 도구의 최신 동향과 바이브코딩 생태계를 분석해서"
         )
 
@@ -268,6 +2408,43 @@ def generate_news_summary(news_items, category="IT"):
     
     내용은 한국어로 작성하고, 전문성 있으면서도 읽기 편한 톤으로 작성해주세요.
     """
+    return prompt
+
+def generate_news_summary(news_items, category="IT", refresh=False):
+    with run_metrics.span("summary", category=category) as span:
+        return _generate_news_summary(news_items, category, refresh, span)
+
+def _generate_news_summary(news_items, category, refresh, span):
+    if not news_items:
+        return '{"headline": "No news items to analyze.", "trends": "", "insight": ""}'
+
+    span["items"] = len(news_items)
+    news_items = cluster_news_items(news_items, category=category)
+    span["clusters"] = len(news_items)
+    news_items, span["off_topic"] = filter_relevant_items(news_items, category)
+    if len(news_items) > NEWS_SELECT_TOP_K:
+        on_topic = len(news_items) - span["off_topic"] if KEYWORD_FILTER_MODE == "demote" else None
+        selected = select_news_items(news_items, preferred=on_topic)
+        log.info(f"[{category}] tf-idf/mmr selection: {len(news_items)} -> {len(selected)} items")
+        news_items = selected
+    span["selected"] = len(news_items)
+    raw_tokens = sum(estimate_tokens(item.summary) for item in news_items)
+    clean_tokens = sum(estimate_tokens(prompt_summary(item)) for item in news_items)
+    span["summary_tokens_raw"] = raw_tokens
+    span["summary_tokens_clean"] = clean_tokens
+    if raw_tokens:
+        log.info(f"[{category}] summaries cleaned: ~{raw_tokens} -> ~{clean_tokens} tokens "
+                 f"({1 - clean_tokens / raw_tokens:.0%} smaller)")
+    prompts = {}
+
+    def prompt_for(model_name):
+        budget = news_token_budget(model_name)
+        if budget not in prompts:
+            news_text, used = build_news_text(news_items, budget)
+            prompts[budget] = build_prompt(news_text, category)
+            log.info(f"[{category}] prompt for {model_name}: {used}/{len(news_items)} items, "
+                     f"~{estimate_tokens(prompts[budget])} tokens (news budget {budget})")
+        return prompts[budget]
 
     model_names = [
         "gemini-2.5-flash",
@@ -276,29 +2453,175 @@ def generate_news_summary(news_items, category="IT"):
         "gemini-1.5-pro",
     ]
 
+    cache_keys = {m: SummaryCache.make_key(news_items, category, m) for m in model_names}
+    if not refresh:
+        cached = summary_cache.get(cache_keys[m] for m in model_names)
+        if cached is not None:
+            log.info(f"[{category}] summary cache hit, skipping Gemini call")
+            span["cache_hit"] = 1
+            return cached
+
     last_error = None
-    import time
+    probe = None
+    if not any(model_health(m).allow() for m in model_names):
+        # Every circuit is open: half-open the one whose cooldown ends first and give
+        # it a single attempt instead of failing without a call.
+        probe = min(model_names, key=lambda m: model_health(m).reopens_at())
+        log.info(f"[{category}] all circuits open, probing {probe}")
     for model_name in model_names:
-        for attempt in range(3): # Try each model up to 3 times
+        health = model_health(model_name)
+        if not health.allow() and model_name != probe:
+            log.info(f"[{category}] skipping {model_name}: circuit open")
+            continue
+        for attempt in range(GEMINI_MAX_ATTEMPTS):
+            started = time.monotonic()
+            span["attempts"] = span.get("attempts", 0) + 1
             try:
-                response = _client.models.generate_content(
-                    model=model_name,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json"
-                    ),
-                )
-                return response.text.replace("```json", "").replace("```", "").strip()
+                prompt = prompt_for(model_name)
+                span["prompt_tokens"] = estimate_tokens(prompt)
+                waited = gemini_limiter.acquire(span["prompt_tokens"])
+                span["limiter_wait_seconds"] = span.get("limiter_wait_seconds", 0) + waited
+                started = time.monotonic()
+                response = _llm_backend.generate(model_name, prompt)
+                latency = time.monotonic() - started
+                health.record_success(latency, response.input_tokens, response.output_tokens)
+                run_metrics.record("llm_call", latency, {"model": model_name, "outcome": "ok"}, {
+                    "input_tokens": response.input_tokens or 0,
+                    "output_tokens": response.output_tokens or 0,
+                })
+                span["model"] = model_name
+                text = response.text.replace("```json", "").replace("```", "").strip()
+                try:
+                    json.loads(text)
+                    summary_cache.put(cache_keys[model_name], text)
+                except ValueError:
+                    pass  # Don't cache malformed answers
+                return text
             except Exception as e:
                 last_error = e
-                # If it's a rate limit or service unavailable, wait then retry
-                if "429" in str(e) or "Too Many Requests" in str(e):
-                    time.sleep(60) # Wait 60s for quota to reset
-                    continue
-                elif "503" in str(e):
-                    time.sleep(30)
-                    continue
-                else:
-                    break # Break inner loop (do not retry this model), try next model
+                kind, retry_after = classify_gemini_error(e)
+                health.record_failure(kind, time.monotonic() - started)
+                run_metrics.record("llm_call", time.monotonic() - started,
+                                   {"model": model_name, "outcome": kind}, status="error")
+                log.warning(f"[{category}] {model_name} attempt {attempt + 1} failed ({kind}): {e}")
+                if kind in ("fatal", "model_error") or not health.allow() or attempt + 1 >= GEMINI_MAX_ATTEMPTS:
+                    break  # Try the next model
+                delay = retry_delay(attempt, retry_after)
+                if delay is None:
+                    log.info(f"[{category}] {model_name} asked to wait {retry_after:.0f}s, trying next model")
+                    break
+                health.record_sleep(delay)
+                span["sleep_seconds"] = span.get("sleep_seconds", 0) + delay
+                time.sleep(delay)
+
+    span["failed"] = 1
+    reason = str(last_error) if last_error is not None else "circuit open for every model"
+    return json.dumps({"headline": "Error: All models failed.", "trends": f"Last error: {reason}", "insight": ""},
+                      ensure_ascii=False)
+
+
+# ==========================================
+# 5. RUN METRICS
+# ==========================================
+
+class RunMetrics:
+    # Spans (name, labels, duration, numeric/text fields) for one batch run such as
+    # auto_fetch. Disabled by default so the long-lived Streamlit process keeps nothing.
+    # Labels must stay low-cardinality (stage, category, model): they become Prometheus
+    # labels; per-feed details like the URL belong in fields, which only go to JSON lines.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.spans = []
+        self.run_id = None
+
+    def enable(self, run_id=None):
+        with self.lock:
+            self.enabled = True
+            self.spans = []
+            self.run_id = run_id or datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+    def record(self, name, duration=None, labels=None, fields=None, status="ok", started_at=None):
+        if not self.enabled:
+            return
+        span = {
+            "span": name,
+            "ts": datetime.fromtimestamp(started_at or time.time()).isoformat(timespec="milliseconds"),
+            "duration_s": round(duration, 4) if duration is not None else None,
+            "status": status,
+            "labels": dict(labels or {}),
+            "fields": dict(fields or {}),
+        }
+        with self.lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name, **labels):
+        # Yields a dict the caller fills with fields (items, bytes, tokens, ...)
+        fields = {}
+        started_at = time.time()
+        started = time.monotonic()
+        status = "ok"
+        try:
+            yield fields
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(name, time.monotonic() - started, labels, fields, status, started_at)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.spans)
+
+    def write_jsonl(self, path):
+        # Appends this run's spans, one JSON object per line
+        spans = self.snapshot()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps({"run_id": self.run_id, **span}, ensure_ascii=False, default=str) + "\n")
+
+    def prometheus_text(self, prefix="newsroom"):
+        # Per (span, labels): duration sum/count, error count and the sum of every
+        # numeric field, in the node_exporter textfile collector format.
+        families = OrderedDict()
+
+        def add(metric, labels, value):
+            series = families.setdefault(f"{prefix}_{metric}", OrderedDict())
+            key = tuple(sorted(labels.items()))
+            series[key] = series.get(key, 0) + value
+
+        for span in self.snapshot():
+            name, labels = span["span"], span["labels"]
+            if span["duration_s"] is not None:
+                add(f"{name}_duration_seconds_sum", labels, span["duration_s"])
+                add(f"{name}_duration_seconds_count", labels, 1)
+            if span["status"] != "ok":
+                add(f"{name}_errors_total", labels, 1)
+            for field, value in span["fields"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    add(f"{name}_{field}", labels, value)
+        add("last_run_timestamp_seconds", {}, int(time.time()))
+
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+        lines = []
+        for metric, series in families.items():
+            lines.append(f"# TYPE {metric} gauge")
+            for key, value in series.items():
+                label_text = ",".join(f'{k}="{escape(v)}"' for k, v in key)
+                value = int(value) if float(value).is_integer() else round(value, 6)
+                lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a temp file and renamed so the collector never reads a partial file
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
 
-    return f'{{"headline": "Error: All models failed.", "trends": "Last error: {str(last_error)}", "insight": ""}}'
+run_metrics = RunMetrics()
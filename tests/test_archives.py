@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+import services
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from postgrest_stub import PostgrestStub
+
+BRIEFING = '{"headline": "**AI** 뉴스", "trends": "- 반도체", "insight": "전망"}'
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with PostgrestStub() as stub:
+        monkeypatch.setattr(services, "db", services.SimpleSupabaseClient(stub.url, "test-key", read_retries=0))
+        yield stub
+
+
+def test_save_archive_stores_rendered_html(stub):
+    services.save_archive("2026-10-17", BRIEFING, "IT")
+    row = stub.db.select("archives")[0]
+    assert row["content"] == BRIEFING and row["rendered"]["schema"] == services.BRIEFING_SCHEMA_VERSION
+
+
+def test_save_archive_without_rendered_column(stub):
+    # schema_archives_rendered.sql not applied: 400/42703, so retry with the raw JSON only
+    stub.db.conn.execute("ALTER TABLE archives DROP COLUMN rendered")
+    services.save_archive("2026-10-17", BRIEFING, "IT")
+    assert [row["content"] for row in stub.db.select("archives")] == [BRIEFING]
+
+
+def test_save_archive_does_not_retry_other_failures(stub):
+    stub.error_rate = 1.0
+    services.save_archive("2026-10-17", BRIEFING, "IT")
+    assert stub.stats()["by_route"] == {"POST /rest/v1/archives": 1}
@@ -0,0 +1,41 @@
+import pytest
+
+import services
+
+
+@pytest.fixture
+def db(monkeypatch):
+    client = services.SqliteClient(":memory:")
+    monkeypatch.setattr(services, "db", client)
+    return client
+
+
+def _stored_password(db):
+    return db.conn.execute("SELECT password FROM comments").fetchone()[0]
+
+
+def test_password_is_hashed_on_insert(db):
+    assert services.add_comment("IT_2026-10-17", "eric", "1234", "hello")
+    stored = _stored_password(db)
+    assert stored != "1234" and stored.startswith("pbkdf2_sha256$")
+    # Inserted rows never echo the password column back
+    assert "password" not in services.get_comments("IT_2026-10-17")[0]
+
+
+def test_delete_checks_password_server_side(db):
+    services.add_comment("IT_2026-10-17", "eric", "1234", "hello")
+    comment_id = services.get_comments("IT_2026-10-17")[0]["id"]
+    assert services.delete_comment(comment_id, "0000") is False
+    assert services.delete_comment(comment_id, "1234") is True
+    assert services.get_comments("IT_2026-10-17") == []
+
+
+def test_delete_falls_back_when_function_is_missing(db):
+    # A database without schema_comments_delete.sql: no rpc, plain passwords
+    del db.rpc_functions["delete_comment"]
+    db.conn.execute("INSERT INTO comments (id, page_id, nickname, password, content) "
+                    "VALUES ('c1', 'IT_2026-10-17', 'eric', '1234', 'hello')")
+    assert services.delete_comment("c1", "0000") is False
+    assert "delete_comment" in db.missing_functions
+    assert services.delete_comment("c1", "1234") is True
+    assert services.get_comments("IT_2026-10-17") == []
@@ -0,0 +1,29 @@
+import services
+
+
+def _rss(title, link):
+    return (
+        "<rss version=\"2.0\"><channel><title>테스트 피드</title>"
+        f"<item><title>{title}</title><link>{link}</link></item>"
+        "</channel></rss>"
+    )
+
+
+def test_charset_from_content_type_header(feed_server):
+    # No XML declaration: the only hint that this is EUC-KR is the HTTP header.
+    feed_server.routes["/rss.xml"] = (
+        {"Content-Type": "application/rss+xml; charset=euc-kr"},
+        _rss("반도체 수출 증가", "https://example.com/a").encode("euc-kr"),
+    )
+    items = services._parse_feed(feed_server.base_url + "/rss.xml", use_cache=False)
+    assert [item["title"] for item in items] == ["반도체 수출 증가"]
+    assert items[0]["source"] == "테스트 피드"
+
+
+def test_relative_link_resolved_against_feed_url(feed_server):
+    feed_server.routes["/news/rss.xml"] = (
+        {"Content-Type": "application/rss+xml; charset=utf-8"},
+        _rss("공지", "/bbs/view.do?id=1").encode("utf-8"),
+    )
+    items = services._parse_feed(feed_server.base_url + "/news/rss.xml", use_cache=False)
+    assert items[0]["link"] == feed_server.base_url + "/bbs/view.do?id=1"
@@ -0,0 +1,30 @@
+import httpx
+
+import services
+
+
+def test_rate_limits_do_not_open_the_circuit():
+    health = services.ModelHealth("m")
+    for _ in range(services.BREAKER_FAILURE_THRESHOLD + 1):
+        health.record_failure("rate_limit", 0.1)
+    assert health.allow()
+    assert health.stats()["errors"] == {"rate_limit": services.BREAKER_FAILURE_THRESHOLD + 1}
+
+
+def test_unavailable_failures_open_the_circuit():
+    health = services.ModelHealth("m")
+    for _ in range(services.BREAKER_FAILURE_THRESHOLD):
+        health.record_failure("unavailable", 0.1)
+    assert not health.allow()
+
+
+def test_only_transport_and_5xx_httpx_errors_are_unavailable():
+    request = httpx.Request("POST", "https://example.com")
+    def status_error(code):
+        return httpx.HTTPStatusError("x", request=request, response=httpx.Response(code, request=request))
+
+    assert services.classify_gemini_error(httpx.ConnectError("x"))[0] == "unavailable"
+    assert services.classify_gemini_error(httpx.ReadTimeout("x"))[0] == "unavailable"
+    assert services.classify_gemini_error(status_error(503))[0] == "unavailable"
+    assert services.classify_gemini_error(status_error(400))[0] == "fatal"
+    assert services.classify_gemini_error(httpx.DecodingError("x"))[0] == "fatal"
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+import requests
+
+import services
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from postgrest_stub import PostgrestStub
+
+
+@pytest.fixture
+def stub():
+    with PostgrestStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+def client(stub):
+    return services.SimpleSupabaseClient(stub.url, "test-key")
+
+
+def test_select_insert_round_trip(client):
+    assert client.insert("feeds", {"category": "IT", "url": "https://a.example/rss"})
+    assert client.insert("feeds", {"category": "IT", "url": "https://a.example/rss"}) is None  # 409
+    client.insert("feeds", {"category": "MVNO", "url": "https://b.example/rss"})
+    assert [r["url"] for r in client.select("feeds", select="url", category="IT")] == ["https://a.example/rss"]
+    rows, total = client.select_with_count("feeds", select="url", order="id", limit=1)
+    assert rows == [{"url": "https://a.example/rss"}] and total == 2
+
+
+def test_insert_select_limits_returned_columns(client):
+    rows = client.insert("comments", {"page_id": "IT_2026-10-17", "nickname": "eric", "password": "1234",
+                                      "content": "hi"}, select=services.COMMENT_COLUMNS)
+    assert set(rows[0]) == set(services.COMMENT_COLUMNS.split(","))
+
+
+def test_rpc_round_trip(client):
+    assert client.rpc("increment_views", {"p_date": "2026-10-17", "p_count": 2}) is True  # void -> 204
+    assert client.rpc("get_view_stats", {"p_days": 7}) == {"total_views": 2, "daily_views": {"2026-10-17": 2}}
+    assert not client.missing_functions
+
+
+def test_missing_function_is_404_pgrst202(stub, client):
+    response = requests.post(f"{stub.url}/rest/v1/rpc/no_such_function", json={})
+    assert response.status_code == 404 and response.json()["code"] == "PGRST202"
+    assert client.rpc("no_such_function") is None
+    assert client.missing_functions == {"no_such_function"}
+
+
+def test_sqlite_errors_become_400(stub):
+    response = requests.get(f"{stub.url}/rest/v1/feeds", params={"select": "nope"})
+    assert response.status_code == 400
+    assert "no such column" in response.json()["message"]
+    # The connection is still answered, not dropped
+    assert requests.get(f"{stub.url}/rest/v1/feeds").status_code == 200
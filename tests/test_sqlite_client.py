@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import services
+
+
+@pytest.fixture
+def db():
+    return services.SqliteClient(":memory:")
+
+
+@pytest.fixture
+def feeds(db):
+    db.insert("feeds", [
+        {"category": "IT", "url": "https://a.example/rss"},
+        {"category": "IT", "url": "https://b.example/rss"},
+        {"category": "MVNO", "url": "https://c.example/rss"},
+    ])
+    return db
+
+
+def test_eq_and_in_filters(feeds):
+    assert [r["url"] for r in feeds.select("feeds", select="url", order="id", category="IT")] == [
+        "https://a.example/rss", "https://b.example/rss"]
+    rows = feeds.select("feeds", select="category", url=["https://a.example/rss", "https://c.example/rss"])
+    assert sorted(r["category"] for r in rows) == ["IT", "MVNO"]
+    assert feeds.select("feeds", url=[]) == []
+
+
+def test_in_filter_quotes_values_with_commas(db):
+    url = 'https://x.example/rss?a=1,b="2"'
+    db.insert("feeds", {"category": "IT", "url": url})
+    assert [r["url"] for r in db.select("feeds", select="url", url=[url, "other"])] == [url]
+
+
+def test_order_limit_and_projection(feeds):
+    rows = feeds.select("feeds", select="id,url", order="id.desc", limit=2)
+    assert [r["url"] for r in rows] == ["https://c.example/rss", "https://b.example/rss"]
+    assert set(rows[0]) == {"id", "url"}
+
+
+def test_or_filter_with_nested_and(feeds):
+    rows = feeds.select("feeds", select="url", order="url", filters={
+        "or": '(url.eq."https://a.example/rss",and(category.eq.MVNO,url.like.*c.example*))'})
+    assert [r["url"] for r in rows] == ["https://a.example/rss", "https://c.example/rss"]
+
+
+def test_unknown_column_is_an_error_not_a_literal(feeds):
+    with pytest.raises(Exception, match="no such column"):
+        feeds.query("feeds", {"select": "nope"})
+    with pytest.raises(services.PostgrestQueryError):
+        feeds.query("feeds", {"category": "between.1"})
+
+
+def test_select_with_count_ignores_limit(feeds):
+    rows, total = feeds.select_with_count("feeds", select="url", order="id", limit=1, category="IT")
+    assert len(rows) == 1 and total == 2
+
+
+def test_insert_duplicate_returns_none(feeds):
+    assert feeds.insert("feeds", {"category": "IT", "url": "https://a.example/rss"}) is None
+
+
+def test_insert_new_returns_only_new_rows(db):
+    first = {"date": "2026-10-17", "views": 1}
+    assert len(db.insert_new("daily_stats", [first])) == 1
+    inserted = db.insert_new("daily_stats", [{"date": "2026-10-17", "views": 5}, {"date": "2026-10-18", "views": 2}])
+    assert [r["date"] for r in inserted] == ["2026-10-18"]
+    assert db.select("daily_stats", date="2026-10-17")[0]["views"] == 1
+
+
+def test_upsert_merges_on_conflict(db):
+    db.upsert("archives", {"date": "2026-10-17", "category": "IT", "content": "a", "rendered": {"schema": 1}},
+              on_conflict="date,category")
+    db.upsert("archives", {"date": "2026-10-17", "category": "IT", "content": "b"}, on_conflict="date,category")
+    rows = db.select("archives")
+    assert len(rows) == 1 and rows[0]["content"] == "b" and rows[0]["rendered"] == {"schema": 1}
+
+
+def test_increment_views_is_atomic(db):
+    db.rpc("increment_views", {"p_date": "2026-10-17", "p_count": 3})
+    db.rpc("increment_views", {"p_date": "2026-10-17"})
+    assert db.rpc("get_view_stats", {"p_days": 7}) == {"total_views": 4, "daily_views": {"2026-10-17": 4}}
+
+    # If the second upsert fails, the first one is rolled back with it
+    db.conn.execute("DROP TABLE daily_stats")
+    assert db.rpc("increment_views", {"p_date": "2026-10-18", "p_count": 10}) is None
+    assert db.select("global_stats", key="total_views")[0]["value"] == 4
+    assert not db.conn.in_transaction
+
+
+def test_unknown_rpc_is_recorded_as_missing(db):
+    assert db.rpc("no_such_function") is None
+    assert db.missing_functions == {"no_such_function"}
+
+
+def test_prune_news_items_keeps_the_last_week(db):
+    now = datetime.now(timezone.utc)
+    for title, age in (("old", 40), ("recent", 3)):
+        item = services.NewsItem(title=title, link=title)
+        first_seen = (now - timedelta(days=age)).isoformat(timespec="milliseconds")
+        services.store_news_items({"https://a.example/rss": [item]}, client=db, first_seen=first_seen)
+    assert services.prune_news_items(client=db, retention=timedelta(days=1)) == 1
+    assert [r["title"] for r in db.select("news_items", select="title")] == ["recent"]